@@ -7,15 +7,19 @@
 # By accessing, using, copying or modifying this work you indicate your
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
 # not expressly granted therein are reserved by Shotgun Software Inc.
+import json
 import logging
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
 import threading
+import time
 import uuid
 import re
 
+from collections import OrderedDict
 from contextlib import contextmanager
 
 import sgtk
@@ -30,6 +34,11 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
     # the maximum size for a generated thumbnail
     MAX_THUMB_SIZE = 512
 
+    # the save profiles documents can be saved with. ``fast`` favors speed,
+    # ``archival`` favors file size and compatibility, and ``compatible`` uses
+    # Photoshop's default options.
+    SAVE_PROFILES = ("fast", "compatible", "archival")
+
     SHOTGUN_ADOBE_PORT = os.environ.get("SHOTGUN_ADOBE_PORT")
     SHOTGUN_ADOBE_APPID = os.environ.get("SHOTGUN_ADOBE_APPID")
 
@@ -68,6 +77,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
     _LOCK = threading.Lock()
     _FAILED_PINGS = 0
     _CONTEXT_CACHE = dict()
+    _SGTK_CACHE = dict()
     _CHECK_CONNECTION_TIMER = None
     _CONTEXT_CHANGES_DISABLED = False
     _DIALOG_PARENT = None
@@ -79,9 +89,93 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
     _HAS_CHECKED_CONTEXT_POST_LAUNCH = False
 
+    # the number of command structures to keep around for reuse when going
+    # back to a previously seen context
+    _COMMANDS_STATE_CACHE_SIZE = 8
+
+    # the maximum number of context header requests made at once when
+    # prefetching the headers of the open documents' contexts
+    _MAX_PREFETCH_REQUESTS = 2
+
+    # the maximum number of entities of the same type to query at once when
+    # prefetching context headers
+    _PREFETCH_BATCH_SIZE = 50
+
+    # documents with more pixels or top level layers than these are exported
+    # from a merged duplicate rather than a full duplicate
+    _EXPORT_MERGED_DUPLICATE_PIXELS = 50 * 1000 * 1000
+    _EXPORT_MERGED_DUPLICATE_LAYERS = 50
+
+    # ExtendScript functions looking a document up by id, and returning its
+    # metrics. the descriptor dimensions are either in pixels or in points,
+    # i.e. pixels at 72 pixels per inch.
+    _DOCUMENT_METRICS_JS = """
+        var findDocument = function (documentId) {
+            for (var i = 0; i < app.documents.length; i++) {
+                if (app.documents[i].id == documentId) {
+                    return app.documents[i];
+                }
+            }
+            return null;
+        };
+        var getDocumentMetrics = function (doc) {
+            var ref = new ActionReference();
+            ref.putIdentifier(charIDToTypeID("Dcmn"), doc.id);
+            var desc = executeActionGet(ref);
+            var toPixels = function (key) {
+                var keyId = stringIDToTypeID(key);
+                var value = desc.getUnitDoubleValue(keyId);
+                if (desc.getUnitDoubleType(keyId) == charIDToTypeID("#Pxl")) {
+                    return value;
+                }
+                return value * doc.resolution / 72;
+            };
+            var bitDepth = 8;
+            if (doc.bitsPerChannel == BitsPerChannelType.ONE) {
+                bitDepth = 1;
+            } else if (doc.bitsPerChannel == BitsPerChannelType.SIXTEEN) {
+                bitDepth = 16;
+            } else if (doc.bitsPerChannel == BitsPerChannelType.THIRTYTWO) {
+                bitDepth = 32;
+            }
+            return {
+                width: toPixels("width"),
+                height: toPixels("height"),
+                resolution: doc.resolution,
+                bitDepth: bitDepth,
+                mode: String(doc.mode).replace("DocumentMode.", ""),
+                layerCount: doc.layers.length
+            };
+        };
+    """
+
+    # the file extensions of the formats documents can be exported to
+    _EXPORT_FORMAT_EXTENSIONS = {
+        "jpeg": ".jpg",
+        "png": ".png",
+    }
+
     ############################################################################
     # context changing
 
+    def pre_context_change(self, old_context, new_context):
+        """
+        Runs before a context change occurs. The apps are reloaded by the
+        change, so the command metadata indexed when they registered their
+        commands is discarded, to be indexed again as they register them for
+        the new context.
+
+        :param old_context: The current context.
+        :param new_context: The context being switched to.
+        """
+
+        # apps will be reloaded and the engine settings may change, so the
+        # command metadata needs to be gathered again.
+        self.__command_index = {}
+        self.__favorites_lookup = None
+        self.__command_dispatch = None
+        self.__context_fields_display_hook = None
+
     def post_context_change(self, old_context, new_context):
         """
         Runs after a context change has occurred. This will trigger the
@@ -91,29 +185,18 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         :param new_context: The current context.
         """
 
-        # keep track of schema load for the current project to make sure we
-        # aren't trying to use sg globals prior to load
-        self.__schema_loaded = False
-
         # get the project id to supply to sg globals
         if new_context.project:
             project_id = new_context.project["id"]
         else:
             project_id = None
 
-        # callback to set the schema loaded flag
-        def _on_schema_loaded():
-            self.__schema_loaded = True
-
-        # tell sg globals to load the schema for the current project. sg globals
-        # will run the callback immediately if already cached so this is likely
-        # very quick.
-        self.__shotgun_globals.run_on_schema_loaded(
-            _on_schema_loaded, project_id=project_id
-        )
+        # tell sg globals to load the schema for the current project, so that
+        # it is likely cached by the time the context header is rendered.
+        self.__load_schema(project_id)
 
         # go ahead and start the process of sending the current state back to js
-        self.__send_state()
+        self.__schedule_send_state()
 
         # If the context is set in the environment, then we'll update it with
         # the new one. This will mean that a CEP extension restart will come
@@ -136,6 +219,11 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         # import and keep a handle on the bundled python module
         self.__tk_photoshopcc = self.import_module("tk_photoshopcc")
 
+        # the uids given to the registered commands, keyed by app instance
+        # name and command name, so that commands registered again after a
+        # context change keep the same uid.
+        self.__command_uids = {}
+
         # constant command uid lookups for these special commands
         self.__jump_to_sg_command_id = self.__get_command_uid()
         self.__jump_to_fs_command_id = self.__get_command_uid()
@@ -158,7 +246,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         self.adobe.command_received.connect(self._handle_command)
         self.adobe.active_document_changed.connect(self._handle_active_document_change)
         self.adobe.run_tests_request_received.connect(self._run_tests)
-        self.adobe.state_requested.connect(self.__send_state)
+        self.adobe.state_requested.connect(self.__on_state_requested)
 
         # in order to use frameworks, they have to be imported via
         # import_module. so they're exposed in the bundled python. keep a handle
@@ -178,17 +266,115 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         # get outselves a settings manager where we can store metadata.
         self.__settings_manager = self.__settings.UserSettings(self)
 
+        # optionally share resolved contexts with the other engine processes
+        # running on this machine, as a second tier behind the in-memory cache.
+        self.__shared_context_store = None
+        if self.get_setting("shared_context_cache"):
+            self.__shared_context_store = self.__tk_photoshopcc.SharedContextStore(
+                os.path.join(self.site_cache_location, "context_cache.db")
+            )
+
         # connect the retriever signals
         self.__sg_data.work_completed.connect(self.__on_worker_signal)
         self.__sg_data.work_failure.connect(self.__on_worker_failure)
 
         # context request uids. we keep track of these to make sure we're only
-        # processing the current requests.
+        # processing the current requests. the entity they were made for is
+        # remembered so that requests still in flight can be reused.
         self.__context_find_uid = None
         self.__context_thumb_uid = None
+        self.__context_display_entity = None
+        self.__context_thumb_entity = None
+
+        # the data displayed in the context header, cached across sessions so
+        # that it can be displayed while it is being refreshed.
+        self.__header_cache = self.__tk_photoshopcc.ContextHeaderCache(
+            os.path.join(self.cache_location, "context_header_cache.json"),
+            self.get_setting("context_header_cache_ttl"),
+        )
+
+        # downscaled entity thumbnails displayed in the context header
+        self.__thumbnail_cache = self.__tk_photoshopcc.ThumbnailCache(
+            os.path.join(self.cache_location, "context_thumbnails"),
+            self.get_setting("context_thumbnail_cache_size") * 1024 * 1024,
+        )
+
+        # headers of the other open documents' contexts waiting to be
+        # prefetched, the prefetched entities whose thumbnail is waiting to be
+        # downloaded, and the prefetch requests in flight keyed by uid.
+        self.__prefetch_queue = []
+        self.__prefetch_thumbnail_queue = []
+        self.__prefetch_requests = {}
+
+        # sending the state is scheduled to run once per event loop turn, no
+        # matter how many times it is requested in between.
+        self.__send_state_scheduled = False
+        self.__send_state_forced = False
+        self.__sending_state = False
+        self.__send_state_coalesced = 0
+
+        # ids of the projects sg globals has cached the schema for. until then,
+        # context headers are rendered with raw field values and the entities
+        # are queued here, keyed by project id, to be rendered again.
+        self.__schema_loaded_projects = set()
+        self.__pending_header_renders = {}
+        self.__raw_shotgun_globals = self.__tk_photoshopcc.RawShotgunGlobals(
+            self.__shotgun_globals
+        )
+
+        # the last command state sent to the panel. used to avoid resending
+        # commands that haven't changed.
+        self.__sent_commands_state = None
+
+        # per-command metadata needed to build the panel state, keyed by
+        # command uid, along with the lookup of favorite commands. both are
+        # rebuilt as needed after a context change.
+        self.__command_index = {}
+        self.__favorites_lookup = None
+
+        # command icons pre-processed for display in the panel
+        self.__icon_cache = self.__tk_photoshopcc.IconCache(
+            os.path.join(self.site_cache_location, "icons")
+        )
 
-        # keep track if sg global schema has been cached
-        self.__schema_loaded = False
+        # document saves, run one at a time against Photoshop
+        self.__save_queue = self.__tk_photoshopcc.SaveQueue(self.__save_documents)
+
+        # the folder temporary files are written to. the files left behind
+        # by sessions that crashed are purged straight away.
+        scratch_root = self.get_setting("scratch_location")
+        if scratch_root:
+            scratch_root = os.path.expandvars(os.path.expanduser(scratch_root))
+        else:
+            scratch_root = os.path.join(tempfile.gettempdir(), "tk-photoshopcc")
+
+        self.__scratch_space = self.__tk_photoshopcc.ScratchSpace(scratch_root)
+        self.__scratch_space.purge_orphans()
+
+        # the last thumbnail generated for each document, keyed by document
+        # id, along with the change token of the document it was generated
+        # from. the thumbnails are kept in a scratch folder.
+        self.__document_thumbnails = {}
+        self.__document_thumbnails_folder = None
+
+        # the scratch folder images exported to a temp file are written to,
+        # handed over to the callers who then own them.
+        self.__exports_folder = None
+
+        # the id of the active document while documents are being exported,
+        # which may be made active to be exported.
+        self.__export_active_id = None
+
+        # command structures built for previously seen contexts
+        self.__commands_state_cache = OrderedDict()
+
+        # lookup of registered commands by uid, used to dispatch command
+        # requests from the panel. rebuilt as needed when commands change.
+        self.__command_dispatch = None
+
+        # instance of the context fields display hook, reused across header
+        # renders so it can keep its templates and memoized display names.
+        self.__context_fields_display_hook = None
 
         # start the retriever thread
         self.__sg_data.start()
@@ -209,7 +395,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
                 pass
 
         self.__setup_connection_timer()
-        self.__send_state()
+        self.__schedule_send_state()
 
         # forward the log file path back to the js side. this is used to direct
         # clients to the file in the event of an error
@@ -222,8 +408,13 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         # context objects from our settings manager. This will allow us to
         # prepopulate our in-memory context cache with the contexts that were
         # known prior to the extension restart.
-        if len(list(self.adobe.app.documents)) > 1:
+        #
+        # The cached contexts are restored in their serialized form and are only
+        # deserialized the first time they're looked up, which keeps this from
+        # delaying the panel becoming usable.
+        if self.adobe.app.documents.length > 1:
             self.logger.debug("Multiple documents found, loading stored context cache.")
+            start_time = time.time()
 
             serial_cache = self.__settings_manager.retrieve(
                 self._CONTEXT_CACHE_KEY,
@@ -232,7 +423,14 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
             )
 
             for key, value in serial_cache.items():
-                self._CONTEXT_CACHE[key] = sgtk.Context.deserialize(value)
+                entry = self.__tk_photoshopcc.ContextCacheEntry.from_dict(key, value)
+                if entry:
+                    self._CONTEXT_CACHE[key] = entry
+
+            self.logger.debug(
+                "Restored %d stored context cache entries in %.3f seconds."
+                % (len(self._CONTEXT_CACHE), time.time() - start_time)
+            )
         else:
             # If there are fewer than 2 documents open, we don't need the stored
             # cache, regardless of whether this is a restart situation or a fresh
@@ -250,6 +448,10 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         Called when the engine should tear down itself and all its apps.
         """
         self.logger.debug("Destroying engine...")
+
+        # don't send any state that may still be scheduled.
+        self.__send_state_scheduled = False
+
         # Set our parent widget back to being owned by the window manager
         # instead of Photoshop's application window.
         if self._PROXY_WIN_HWND and sys.platform == "win32":
@@ -271,6 +473,15 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         # currently-processing request has completed.
         self.__sg_data.stop()
 
+        if self.__shared_context_store:
+            self.__shared_context_store.close()
+
+        self.__header_cache.flush()
+
+        # remove the temporary files written during this session, including
+        # the thumbnails kept for reuse.
+        self.__scratch_space.cleanup()
+
         # Disconnect from the server.
         self.adobe.disconnect()
 
@@ -283,7 +494,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
             self._handle_active_document_change
         )
         self.adobe.run_tests_request_received.disconnect(self._run_tests)
-        self.adobe.state_requested.disconnect(self.__send_state)
+        self.adobe.state_requested.disconnect(self.__on_state_requested)
 
     def post_qt_init(self):
         """
@@ -352,10 +563,95 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         """
         Registers a new command with the engine. For Adobe RPC purposes,
         a "uid" property is added to the command's properties.
+
+        The uid only depends on the app instance and name of the command, so
+        a command registered again after a context change keeps the uid it was
+        given the first time, and the panel sees it as unchanged.
         """
         properties = properties or dict()
-        properties["uid"] = self.__get_command_uid()
-        return super().register_command(name, callback, properties)
+        app_name = getattr(properties.get("app"), "instance_name", None)
+        properties["uid"] = self.__get_command_uid((app_name, name))
+        result = super().register_command(name, callback, properties)
+
+        # index the metadata needed to display the command in the panel now,
+        # rather than every time the state is sent.
+        self.__get_command_metadata(properties)
+
+        # the dispatch table will be rebuilt to include the new command the
+        # next time a command is requested.
+        self.__command_dispatch = None
+
+        return result
+
+    def get_document_metrics(self, document=None):
+        """
+        Returns the dimensions and format of the given document or of the
+        current document.
+
+        The metrics are retrieved in a single call to Photoshop, in pixels
+        whatever the ruler units preference is, without changing it. The
+        dimensions are read from the document's action descriptor rather than
+        from its UnitValues, which can't be converted to pixels when the ruler
+        units are percent.
+
+        :param document: The document to get the metrics of. Assumes the
+            active document if ``None`` is supplied.
+        :returns: A ``dict`` with the document ``width`` and ``height`` in
+            pixels, its ``resolution`` in pixels per inch, its ``bit_depth``
+            per channel, its color ``mode``, e.g. ``RGB`` or ``CMYK``, and its
+            top level ``layer_count``.
+        :raises: RuntimeError if the metrics can't be retrieved.
+        """
+        document = document or self.adobe.app.activeDocument
+        document_id = document.id
+
+        result = self.adobe.rpc_eval(
+            """
+            (function (documentId) {
+                %s
+                var doc = findDocument(documentId);
+                if (!doc) {
+                    return "";
+                }
+                var metrics = getDocumentMetrics(doc);
+                return [
+                    metrics.width,
+                    metrics.height,
+                    metrics.resolution,
+                    metrics.bitDepth,
+                    metrics.mode,
+                    metrics.layerCount
+                ].join("\\n");
+            })(%d);
+            """
+            % (self._DOCUMENT_METRICS_JS, document_id)
+        )
+
+        try:
+            (width, height, resolution, bit_depth, mode, layer_count) = str(
+                result
+            ).split("\n")
+            metrics = dict(
+                width=int(round(float(width))),
+                height=int(round(float(height))),
+                resolution=float(resolution),
+                bit_depth=int(bit_depth),
+                mode=mode,
+                layer_count=int(layer_count),
+            )
+        except ValueError:
+            raise RuntimeError(
+                "Unable to retrieve the metrics of document %s: %s"
+                % (document_id, result)
+            )
+
+        if metrics["width"] <= 0 or metrics["height"] <= 0:
+            raise RuntimeError(
+                "Unable to retrieve the size of document %s: %s x %s"
+                % (document_id, metrics["width"], metrics["height"])
+            )
+
+        return metrics
 
     def export_as_jpeg(
         self, document=None, output_path=None, max_size=2048, quality=12
@@ -372,108 +668,314 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         :returns: The full path to the exported image.
         :raises: RuntimeError if the document or its size can't be retrieved.
         """
-        adobe = self.adobe
-
-        # Get some current values so we can restore them.
-        original_ruler_units = adobe.app.preferences.rulerUnits
-        original_dialog_mode = adobe.app.displayDialogs
-
         # If no output_path was given, use a temp file.
-        jpeg_pub_path = output_path or os.path.join(
-            tempfile.gettempdir(), "%s_sgtk.jpg" % uuid.uuid4().hex
-        )
-
-        with self.context_changes_disabled():
-            try:
-                # Set unit system to pixels:
-                adobe.app.preferences.rulerUnits = adobe.Units.PIXELS
-                # Disable dialogs.
-                adobe.app.displayDialogs = adobe.DialogModes.NO
+        jpeg_pub_path = output_path or self.__get_scratch_jpeg_path()
 
+        try:
+            with self.__export_settings():
                 try:
-                    active_doc = document or adobe.app.activeDocument
+                    active_doc = document or self.adobe.app.activeDocument
                 except RuntimeError as e:
                     # Exceptions reported by Photoshop CEP through the RPC API
-                    # are pretty useless, so catch the error, raise our own exception
-                    # but still log the original exception for debug purpose.
+                    # are pretty useless, so catch the error, raise our own
+                    # exception but still log the original exception for debug
+                    # purpose.
                     self.logger.debug(
                         "Unable to retrieve a document: %s" % e,
                         exc_info=True,  # Get traceback automatically
                     )
                     raise RuntimeError("Unable to retrieve a document")
 
-                orig_name = active_doc.name
-                width_str = str(active_doc.width.value)
-                height_str = str(active_doc.height.value)
-
-                # Get a temp document name so we can manipulate the document without
-                # affecting the original docuement.
-                name, sfx = os.path.splitext(orig_name)
-                # a "." is included in the extension returned by splitext
-                jpeg_name = "%s_tkjpeg%s" % (name, sfx)
-
-                # Find the doc size in pixels
-                # Note: this doesn't handle measurements other than pixels.
-                doc_width = doc_height = 0
-                # It seems we used to get back "<size> px" but now we receive back
-                # just a number, so let's have the " px" bit optional.
-                exp = re.compile("^(?P<value>[0-9]+)( px)?$")
-                mo = exp.match(width_str)
-                if mo:
-                    doc_width = int(mo.group("value"))
-                mo = exp.match(height_str)
-                if mo:
-                    doc_height = int(mo.group("value"))
-
-                jpeg_width = jpeg_height = 0
-                if doc_width and doc_height:
-                    max_sz = max(doc_width, doc_height)
-                    if max_sz > max_size:
-                        scale = min(float(max_size) / float(max_sz), 1.0)
-                        jpeg_width = max(min(int(doc_width * scale), doc_width), 1)
-                        jpeg_height = max(min(int(doc_height * scale), doc_height), 1)
-                else:
-                    raise RuntimeError(
-                        "Unable to retrieve document size from %s x %s "
-                        % (
-                            width_str,
-                            height_str,
-                        )
-                    )
+                (output_dir, file_name) = os.path.split(jpeg_pub_path)
+                (output_name, extension) = os.path.splitext(file_name)
+                self.__export_document(
+                    active_doc, output_dir, output_name, extension, max_size, quality
+                )
+        except Exception:
+            # the temp file won't be handed over, so it's removed straight away
+            if not output_path:
+                self.__remove_scratch_file(jpeg_pub_path)
+            raise
+
+        return jpeg_pub_path
+
+    def export_documents(
+        self,
+        documents,
+        output_dir,
+        max_size=2048,
+        quality=12,
+        format="jpeg",
+        callback=None,
+    ):
+        """
+        Export images from several documents in a single pass.
+
+        The Photoshop preferences the export relies on are set once for the
+        whole batch, rather than for each document. Documents that can't be
+        exported are logged and left out of the results.
+
+        :param documents: The documents to export images from.
+        :param str output_dir: The folder to write the images to. Each image
+            is named after its document.
+        :param int max_size: The maximum width and height of the exported images.
+        :param int quality: The Jpeg quality of the exported images.
+        :param str format: The format of the exported images, ``jpeg`` or ``png``.
+        :param callback: An optional callable, called with each document and
+            the path to its image as soon as it is exported.
+        :returns: A ``dict`` of exported documents to image paths.
+        :raises: ValueError if the format isn't supported.
+        """
+        if format not in self._EXPORT_FORMAT_EXTENSIONS:
+            raise ValueError("Unsupported export format: %s" % (format,))
 
-                # Get a file object from Photoshop for this path and the current
-                # jpg save options:
-                jpeg_file = adobe.File(jpeg_pub_path)
-                jpeg_options = adobe.JPEGSaveOptions()
-                jpeg_options.quality = quality
+        extension = self._EXPORT_FORMAT_EXTENSIONS[format]
 
-                # duplicate the original doc:
-                save_options = adobe.SaveOptions.DONOTSAVECHANGES
-                jpeg_doc = active_doc.duplicate(jpeg_name)
+        # Photoshop won't ensure that the folder is created when saving, so we
+        # must make sure it exists
+        ensure_folder_exists(output_dir)
 
+        exported = {}
+        output_names = set()
+
+        with self.__export_settings():
+            for document in documents:
                 try:
-                    # Flatten image:
-                    jpeg_doc.flatten()
-                    # Convert to eight bits
-                    jpeg_doc.bitsPerChannel = adobe.BitsPerChannelType.EIGHT
-                    # Resize if needed:
-                    if jpeg_width and jpeg_height:
-                        jpeg_doc.resizeImage(
-                            "%d px" % jpeg_width, "%d px" % jpeg_height
-                        )
-                    # Save:
-                    jpeg_doc.saveAs(jpeg_file, jpeg_options, True)
+                    # documents with the same name, e.g. from different
+                    # folders, must not overwrite each other's images.
+                    output_path = self.__export_document(
+                        document,
+                        output_dir,
+                        None,
+                        extension,
+                        max_size,
+                        quality,
+                        format,
+                        used_names=output_names,
+                    )
+                except Exception as e:
+                    self.logger.warning(
+                        "Unable to export document: %s" % (e,),
+                        exc_info=True,
+                    )
+                    continue
 
-                finally:
-                    # Close the doc:
-                    jpeg_doc.close(save_options)
+                (output_name, _) = os.path.splitext(os.path.basename(output_path))
+                output_names.add(output_name.lower())
+                exported[document] = output_path
+
+                if callback:
+                    callback(document, output_path)
+
+        return exported
+
+    @contextmanager
+    def __export_settings(self):
+        """
+        A context manager disabling Photoshop dialogs while documents are
+        exported, and restoring the original dialog mode and active document
+        on exit. Context changes are disabled in between, so that documents
+        can be made active to be exported.
+        """
+        adobe = self.adobe
+
+        # Get the current values so we can restore them.
+        original_dialog_mode = adobe.app.displayDialogs
+        try:
+            original_active_document = adobe.app.activeDocument
+            original_active_id = original_active_document.id
+        except RuntimeError:
+            # no document is open
+            original_active_document = None
+            original_active_id = None
+
+        self.__export_active_id = original_active_id
+
+        with self.context_changes_disabled():
+            try:
+                # Disable dialogs.
+                adobe.app.displayDialogs = adobe.DialogModes.NO
+
+                yield
 
             finally:
-                # Set units back to original
-                adobe.app.preferences.rulerUnits = original_ruler_units
                 # Set dialog mode back to original.
                 adobe.app.displayDialogs = original_dialog_mode
-        return jpeg_pub_path
+
+                # restore the active document
+                if self.__export_active_id != original_active_id:
+                    adobe.app.activeDocument = original_active_document
+                self.__export_active_id = None
+
+    def __export_document(
+        self,
+        document,
+        output_dir,
+        output_name,
+        extension,
+        max_size,
+        quality,
+        format="jpeg",
+        used_names=(),
+    ):
+        """
+        Export an image from the given document, in a single call to Photoshop.
+
+        Expects to be called within :meth:`__export_settings`.
+
+        The image is exported the quickest way the document allows:
+
+        - ``save_copy``: the image is saved as a copy straight from the
+          document, which is possible when it doesn't need to be resized or
+          converted to 8 bits. The document is made active first.
+        - ``merged_duplicate``: the image is saved from a duplicate of the
+          document holding only its merged layers. Used for large documents or
+          documents with many layers.
+        - ``duplicate``: the image is saved from a flattened duplicate of the
+          document.
+
+        :param document: The document to export an image from.
+        :param str output_dir: The folder to write the image to.
+        :param str output_name: The name of the image, without its extension,
+            or None to name it after the document.
+        :param str extension: The extension of the image, including the ".".
+        :param int max_size: The maximum width and height of the exported image.
+        :param int quality: The Jpeg quality of the exported image.
+        :param str format: The format of the exported image, ``jpeg`` or ``png``.
+        :param used_names: The lower case names of the images already in the
+            folder. An image named after its document gets the document id
+            appended to its name if it is already used.
+        :returns: The path to the exported image.
+        :raises: RuntimeError if the document can't be exported.
+        """
+        document_id = document.id
+        start_time = time.time()
+
+        result = self.adobe.rpc_eval(
+            """
+            (function (documentId, outputDir, outputName, extension, usedNames,
+                       maxSize, quality, format, mergedPixels, mergedLayers) {
+                %s
+                var doc = findDocument(documentId);
+                if (!doc) {
+                    return "the document isn't open";
+                }
+                var metrics = getDocumentMetrics(doc);
+                var width = Math.round(metrics.width);
+                var height = Math.round(metrics.height);
+                if (width <= 0 || height <= 0) {
+                    return "invalid document size " + width + " x " + height;
+                }
+
+                // the extension of the document name starts at its last "."
+                var name = doc.name;
+                var suffix = "";
+                var dot = name.lastIndexOf(".");
+                if (dot > 0) {
+                    suffix = name.substring(dot);
+                    name = name.substring(0, dot);
+                }
+                if (outputName === null) {
+                    outputName = name;
+                    if (usedNames[outputName.toLowerCase()]) {
+                        outputName += "_" + doc.id;
+                    }
+                }
+
+                var exportWidth = 0;
+                var exportHeight = 0;
+                var maxSz = Math.max(width, height);
+                if (maxSz > maxSize) {
+                    var scale = Math.min(maxSize / maxSz, 1.0);
+                    exportWidth = Math.max(Math.min(Math.floor(width * scale), width), 1);
+                    exportHeight = Math.max(Math.min(Math.floor(height * scale), height), 1);
+                }
+
+                var strategy = "duplicate";
+                if (!exportWidth && metrics.bitDepth == 8) {
+                    strategy = "save_copy";
+                } else if (
+                    width * height > mergedPixels
+                    || metrics.layerCount > mergedLayers
+                ) {
+                    strategy = "merged_duplicate";
+                }
+
+                var exportFile = new File(outputDir + outputName + extension);
+                var exportOptions;
+                if (format == "png") {
+                    exportOptions = new PNGSaveOptions();
+                } else {
+                    exportOptions = new JPEGSaveOptions();
+                    exportOptions.quality = quality;
+                }
+
+                if (strategy == "save_copy") {
+                    // nothing to change in the document, so Photoshop can
+                    // write the image straight from it, once it is active.
+                    if (app.activeDocument.id != doc.id) {
+                        app.activeDocument = doc;
+                    }
+                    doc.saveAs(exportFile, exportOptions, true);
+                } else {
+                    // a duplicate is manipulated rather than the original
+                    // document. a merged duplicate only holds the composite
+                    // image, sparing a copy of every layer.
+                    var exportDoc = doc.duplicate(
+                        name + "_tkjpeg" + suffix,
+                        strategy == "merged_duplicate"
+                    );
+                    try {
+                        if (strategy == "duplicate") {
+                            exportDoc.flatten();
+                        }
+                        exportDoc.bitsPerChannel = BitsPerChannelType.EIGHT;
+                        if (exportWidth) {
+                            exportDoc.resizeImage(
+                                new UnitValue(exportWidth, "px"),
+                                new UnitValue(exportHeight, "px")
+                            );
+                        }
+                        exportDoc.saveAs(exportFile, exportOptions, true);
+                    } finally {
+                        exportDoc.close(SaveOptions.DONOTSAVECHANGES);
+                    }
+                }
+
+                return [outputName, strategy, app.activeDocument.id].join("\\n");
+            })(%d, %s, %s, %s, %s, %d, %d, %s, %d, %d);
+            """
+            % (
+                self._DOCUMENT_METRICS_JS,
+                document_id,
+                json.dumps(os.path.join(output_dir, "")),
+                json.dumps(output_name),
+                json.dumps(extension),
+                json.dumps(dict.fromkeys(used_names, True)),
+                max_size,
+                quality,
+                json.dumps(format),
+                self._EXPORT_MERGED_DUPLICATE_PIXELS,
+                self._EXPORT_MERGED_DUPLICATE_LAYERS,
+            )
+        )
+
+        try:
+            (output_name, strategy, active_id) = str(result).split("\n")
+            self.__export_active_id = int(active_id)
+        except ValueError:
+            raise RuntimeError(
+                "Unable to export document %s: %s" % (document_id, result)
+            )
+
+        output_path = os.path.join(output_dir, "%s%s" % (output_name, extension))
+
+        self.logger.debug(
+            "Exported document %s to %s using the %s strategy in %.1f ms."
+            % (document_id, output_path, strategy, (time.time() - start_time) * 1000)
+        )
+
+        return output_path
 
     def generate_thumbnail(self, document=None, output_path=None):
         """
@@ -491,12 +993,45 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
         jpeg_path = None
         try:
+            document = document or self.adobe.app.activeDocument
+
+            # reuse the thumbnail previously generated for the document if it
+            # hasn't changed since.
+            document_id = document.id
+            change_token = self.__get_document_change_token(document_id)
+            (cached_token, cached_path) = self.__document_thumbnails.get(
+                document_id, (None, None)
+            )
+
+            if (
+                change_token is not None
+                and change_token == cached_token
+                and os.path.exists(cached_path)
+            ):
+                self.logger.debug(
+                    "Reusing thumbnail generated for unchanged document %s."
+                    % (document_id,)
+                )
+                reused_path = output_path or self.__get_scratch_jpeg_path()
+                try:
+                    shutil.copyfile(cached_path, reused_path)
+                except Exception:
+                    # the temp file won't be handed over, so it's removed
+                    # straight away
+                    if not output_path:
+                        self.__remove_scratch_file(reused_path)
+                    raise
+                return reused_path
+
             jpeg_path = self.export_as_jpeg(
                 document,
                 output_path,
                 max_size=self.MAX_THUMB_SIZE,
                 quality=3,  # Default quality value for Photoshop Jpeg option
             )
+
+            if change_token is not None:
+                self.__cache_document_thumbnail(document_id, change_token, jpeg_path)
         except Exception as e:
             # Log the error for debug purpose.
             self.logger.warning(
@@ -508,94 +1043,256 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
     def save(self, document):
         """
         Save the document in place
+
+        The save is run through the :attr:`save_queue`, after any save already
+        queued, and this method returns once it is done.
+
+        :param document: The document to save.
         """
-        if document.saved:
-            # since Photoshop 24.1.0, saving an already saved file triggers errors
-            return
+        self.__save_queue.wait(self.__save_queue.add_job(document))
 
-        with self.context_changes_disabled():
+    def save_to_path(self, document, path, profile=None):
+        """
+        Save the document to the supplied path.
+
+        The save is run through the :attr:`save_queue`, after any save already
+        queued, and this method returns once it is done.
+
+        :param document: The document to save.
+        :param str path: The path to save the document to. Its extension
+            determines the file format.
+        :param str profile: The name of the save profile to use, one of
+            :attr:`SAVE_PROFILES`. Defaults to the ``save_profile`` setting.
+        :raises: ValueError if the save profile isn't supported.
+        """
+        self.__save_queue.wait(self.__save_queue.add_job(document, path, profile))
+
+    def save_documents(self, items, profile=None):
+        """
+        Save several documents at once, e.g. to save all the open documents
+        before publishing.
+
+        Each document is made active once at most, and the active document is
+        only restored once the whole batch is saved. Documents to save in place
+        with no unsaved changes are skipped.
+
+        The saves are run through the :attr:`save_queue` as a single job, after
+        any save already queued, and this method returns once they are done.
+
+        :param items: A ``list`` of (document, path) tuples. Documents with a
+            path of None are saved in place.
+        :param str profile: The name of the save profile to use, one of
+            :attr:`SAVE_PROFILES`. Defaults to the ``save_profile`` setting.
+        :raises: ValueError if the save profile isn't supported.
+        """
+        self.__save_queue.wait(self.__save_queue.add_batch_job(items, profile))
+
+    def __save_documents(self, items, profile):
+        """
+        Saves documents on behalf of the save queue.
+
+        The saves are grouped by document, starting with the active one, so
+        that each document only needs to be made active once.
+
+        :param items: A ``list`` of (document, path) tuples. Documents with a
+            path of None are saved in place.
+        :param str profile: The name of the save profile to use.
+        :raises: ValueError if the save profile isn't supported.
+        """
+        profile = profile or self.get_setting("save_profile")
+        if profile not in self.SAVE_PROFILES:
+            raise ValueError("Unsupported save profile: %s" % (profile,))
+
+        app = self.adobe.app
+
+        with self.context_changes_disabled(), self.__save_profile_preferences(profile):
             # remember the active document so that we can restore it.
-            previous_active_document = self.adobe.app.activeDocument
+            previous_active_document = app.activeDocument
+            previous_active_id = previous_active_document.id
+            active_id = previous_active_id
 
-            # make the document being processed the active document
-            self.adobe.app.activeDocument = document
+            saves = OrderedDict()
+            for document, path in items:
+                saves.setdefault(document.id, (document, []))[1].append(path)
 
-            document.save()
+            if previous_active_id in saves:
+                saves.move_to_end(previous_active_id, last=False)
 
-            # restore the active document
-            self.adobe.app.activeDocument = previous_active_document
+            try:
+                for document_id, (document, paths) in saves.items():
+                    for path in paths:
+                        if self.__is_document_saved(document, path):
+                            # since Photoshop 24.1.0, saving an already saved
+                            # file triggers errors
+                            continue
+
+                        # make the document being processed the active document
+                        if document_id != active_id:
+                            app.activeDocument = document
+                            active_id = document_id
+
+                        self.__save_active_document(document, path, profile)
+            finally:
+                # restore the active document
+                if active_id != previous_active_id:
+                    app.activeDocument = previous_active_document
 
-    def save_to_path(self, document, path):
+    def __is_document_saved(self, document, path):
         """
-        Save the document to the supplied path.
+        Checks whether the given document has no unsaved changes and already
+        lives at the given path.
+
+        :param document: The document to check.
+        :param str path: The path the document is about to be saved to, or
+            None if it is about to be saved in place.
+        :returns: True if there is no need to save the document.
+        """
+        if not document.saved:
+            return False
+
+        if path is None:
+            return True
+
+        try:
+            document_path = document.fullName.fsName
+        except RuntimeError:
+            # the document has never been saved
+            return False
+
+        return os.path.normcase(os.path.normpath(document_path)) == os.path.normcase(
+            os.path.normpath(path)
+        )
+
+    def __save_active_document(self, document, path, profile):
+        """
+        Save the active document to the supplied path.
+
+        :param document: The active document.
+        :param str path: The path to save the document to, or None to save it
+            in place.
+        :param str profile: The name of the save profile to use.
         """
 
         # TODO: more logic is needed here to save account for different file
         # options. By default, the file will always be saved to a PDF.
 
-        with self.context_changes_disabled():
-            # remember the active document so that we can restore it.
-            previous_active_document = self.adobe.app.activeDocument
-
-            # make the document being processed the active document
-            self.adobe.app.activeDocument = document
+        start_time = time.time()
 
+        if path is None:
+            document.save()
+        else:
             (_, ext) = os.path.splitext(path)
             ext = ext.lower()
 
             # first, check if file is .psb since it is processed using the adobe bridge
             if ext == ".psb":
                 self.adobe.save_as_psb(path)
-                # restore the active document
-                self.adobe.app.activeDocument = previous_active_document
-                return
-
-            # the following extensions follow the same pattern of defining options
-            # that will be supplied to the document's saveAs method
-            if ext == ".bmp":
-                save_options = self.adobe.BMPSaveOptions()
-            elif ext == ".dcs":
-                # DCS1_SaveOptions is not used for ".dcs" files, DCS2_SaveOptions is used instead
-                save_options = self.adobe.DCS2_SaveOptions()
-            elif ext == ".eps":
-                save_options = self.adobe.EPSSaveOptions()
-            elif ext == ".gif":
-                save_options = self.adobe.GIFSaveOptions()
-            elif ext in [".jpg", ".jpeg"]:
-                save_options = self.adobe.JPEGSaveOptions()
-                # the default quality for jpg is 3, so we set it to the maximum: 12
-                save_options.quality = 12
-            elif ext == ".pdf":
-                save_options = self.adobe.PDFSaveOptions()
-            elif ext in [".pict", ".pct", ".pic"]:
-                # PICTResourceSaveOptions is skipped for now, need a way to differentiate PICT
-                # files from PICT resource files
-                save_options = self.adobe.PICTFileSaveOptions()
-            elif ext == ".pixar":
-                save_options = self.adobe.PixarSaveOptions()
-            elif ext == ".png":
-                save_options = self.adobe.PNGSaveOptions()
-            elif ext == ".psd":
-                save_options = self.adobe.PhotoshopSaveOptions()
-            elif ext == ".raw":
-                save_options = self.adobe.RawSaveOptions()
-            elif ext in [".sgi", ".rgb", ".rgba", ".bw", ".int", ".inta"]:
-                save_options = self.adobe.SGIRGBSaveOptions()
-            elif ext in [".tga", ".targa"]:
-                save_options = self.adobe.TargaSaveOptions()
-            elif ext in [".tif", ".tiff"]:
-                save_options = self.adobe.TiffSaveOptions()
             else:
-                # default value
-                save_options = self.adobe.PhotoshopSaveOptions()
+                save_options = self.__get_save_options(ext, profile)
+
+                # Photoshop won't ensure that the folder is created when saving, so we must make sure it exists
+                ensure_folder_exists(os.path.dirname(path))
+
+                document.saveAs(self.adobe.File(path), save_options)
+
+        self.logger.debug(
+            "Saved %s using the %s profile in %.1f ms."
+            % (path or document.name, profile, (time.time() - start_time) * 1000)
+        )
+
+    def __get_save_options(self, ext, profile):
+        """
+        Returns the options to supply to a document's saveAs method to save it
+        in the format matching the given extension.
+
+        :param str ext: The lower case file extension, including the ".".
+        :param str profile: The name of the save profile to use.
+        :returns: A save options object.
+        """
+
+        # the following extensions follow the same pattern of defining options
+        # that will be supplied to the document's saveAs method
+        if ext == ".bmp":
+            save_options = self.adobe.BMPSaveOptions()
+        elif ext == ".dcs":
+            # DCS1_SaveOptions is not used for ".dcs" files, DCS2_SaveOptions is used instead
+            save_options = self.adobe.DCS2_SaveOptions()
+        elif ext == ".eps":
+            save_options = self.adobe.EPSSaveOptions()
+        elif ext == ".gif":
+            save_options = self.adobe.GIFSaveOptions()
+        elif ext in [".jpg", ".jpeg"]:
+            save_options = self.adobe.JPEGSaveOptions()
+            # the default quality for jpg is 3, so we set it to the maximum: 12
+            save_options.quality = 12
+        elif ext == ".pdf":
+            save_options = self.adobe.PDFSaveOptions()
+        elif ext in [".pict", ".pct", ".pic"]:
+            # PICTResourceSaveOptions is skipped for now, need a way to differentiate PICT
+            # files from PICT resource files
+            save_options = self.adobe.PICTFileSaveOptions()
+        elif ext == ".pixar":
+            save_options = self.adobe.PixarSaveOptions()
+        elif ext == ".png":
+            save_options = self.adobe.PNGSaveOptions()
+            # favor speed or size over the default compression level
+            if profile == "fast":
+                save_options.compression = 1
+            elif profile == "archival":
+                save_options.compression = 9
+        elif ext == ".psd":
+            save_options = self.adobe.PhotoshopSaveOptions()
+        elif ext == ".raw":
+            save_options = self.adobe.RawSaveOptions()
+        elif ext in [".sgi", ".rgb", ".rgba", ".bw", ".int", ".inta"]:
+            save_options = self.adobe.SGIRGBSaveOptions()
+        elif ext in [".tga", ".targa"]:
+            save_options = self.adobe.TargaSaveOptions()
+        elif ext in [".tif", ".tiff"]:
+            save_options = self.adobe.TiffSaveOptions()
+            # compressing the image and its layers with zip is slow but gives
+            # the smallest files, not compressing them at all is the fastest.
+            if profile == "fast":
+                save_options.imageCompression = self.adobe.TIFFEncoding.NONE
+                save_options.layerCompression = self.adobe.LayerCompression.RLE
+            elif profile == "archival":
+                save_options.imageCompression = self.adobe.TIFFEncoding.TIFFZIP
+                save_options.layerCompression = self.adobe.LayerCompression.ZIP
+        else:
+            # default value
+            save_options = self.adobe.PhotoshopSaveOptions()
+
+        return save_options
+
+    @contextmanager
+    def __save_profile_preferences(self, profile):
+        """
+        A context manager setting the Photoshop preferences matching the given
+        save profile, and restoring the original preferences on exit.
+
+        Writing the maximized compatibility composite of psd and psb files
+        takes time and space. The ``fast`` profile skips it, the ``archival``
+        profile always includes it and the ``compatible`` profile leaves the
+        user's preference untouched.
+
+        :param str profile: The name of the save profile to use.
+        """
+        if profile == "compatible":
+            yield
+            return
 
-            # Photoshop won't ensure that the folder is created when saving, so we must make sure it exists
-            ensure_folder_exists(os.path.dirname(path))
+        preferences = self.adobe.app.preferences
+        original_compatibility = preferences.maximizeCompatibility
 
-            document.saveAs(self.adobe.File(path), save_options)
+        if profile == "fast":
+            preferences.maximizeCompatibility = self.adobe.QueryStateType.NEVER
+        else:
+            preferences.maximizeCompatibility = self.adobe.QueryStateType.ALWAYS
 
-            # restore the active document
-            self.adobe.app.activeDocument = previous_active_document
+        try:
+            yield
+        finally:
+            preferences.maximizeCompatibility = original_compatibility
 
     def save_as(self, document):
         """
@@ -828,12 +1525,17 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
                 self.logger.debug("Document found in context cache: %r" % context)
             else:
                 try:
-                    context = sgtk.sgtk_from_path(
+                    start_time = time.time()
+                    context = self.__get_sgtk_from_path(
                         active_document_path
                     ).context_from_path(
                         active_document_path,
                         previous_context=self.context,
                     )
+                    self.logger.debug(
+                        "Resolved context for %s in %.3f seconds."
+                        % (active_document_path, time.time() - start_time)
+                    )
                     self.add_to_context_cache(active_document_path, context)
                 except Exception:
                     self.logger.debug(
@@ -875,6 +1577,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         :param int uid: The unique id of the engine command to run.
         """
 
+        received_time = time.time()
         self.logger.debug("Handling command request for uid: %s" % (uid,))
 
         with self.heartbeat_disabled():
@@ -888,15 +1591,20 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
                 self._jump_to_sg()
             else:
                 # a registered command was triggered
-                for command in self.commands.values():
-                    if command.get("properties", dict()).get("uid") == uid:
-                        self.logger.debug(
-                            "Executing callback for command: %s" % (command,)
-                        )
-                        result = command["callback"]()
-                        if isinstance(result, QtGui.QWidget):
-                            # if the callback returns a widget, keep a handle on it
-                            self.__qt_dialogs.append(result)
+                command = self.__get_command_by_uid(uid)
+                if command is None:
+                    self.logger.debug("No registered command for uid: %s" % (uid,))
+                    return
+
+                self.logger.debug("Executing callback for command: %s" % (command,))
+                self.logger.debug(
+                    "Command request dispatched in %.1f ms."
+                    % ((time.time() - received_time) * 1000.0,)
+                )
+                result = command["callback"]()
+                if isinstance(result, QtGui.QWidget):
+                    # if the callback returns a widget, keep a handle on it
+                    self.__qt_dialogs.append(result)
 
     def _handle_logging(self, level, message):
         """
@@ -984,6 +1692,30 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
     ############################################################################
     # properties
 
+    @property
+    def scratch_space(self):
+        """
+        The folder temporary files are written to.
+
+        Operations create their own folder in it with ``create_folder`` and
+        remove it with ``remove_folder`` once done, or use the ``operation``
+        context manager to do both. Folders that aren't removed are cleaned up
+        when the engine shuts down.
+        """
+        return self.__scratch_space
+
+    @property
+    def save_queue(self):
+        """
+        The queue document saves are run through.
+
+        Saves added to the queue with ``add_job`` are run one at a time from
+        the Qt event loop, and report their progress and outcome through the
+        queue's signals. This allows a UI to remain responsive while several
+        documents are saved.
+        """
+        return self.__save_queue
+
     @property
     def adobe(self):
         """
@@ -1328,13 +2060,43 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
     ############################################################################
     # internal methods
 
-    def __get_command_uid(self):
+    def __get_command_uid(self, identity=None):
         """
         Returns a guaranteed unique command id.
+
+        :param identity: A hashable identifying the command, such as its app
+            instance name and command name. The same uid is returned every time
+            a given identity is supplied. A new uid is returned every time if
+            ``None`` is supplied.
         """
         with self._LOCK:
+            if identity is not None and identity in self.__command_uids:
+                return self.__command_uids[identity]
+
             self._COMMAND_UID_COUNTER += 1
-            return self._COMMAND_UID_COUNTER
+            uid = self._COMMAND_UID_COUNTER
+
+            if identity is not None:
+                self.__command_uids[identity] = uid
+
+            return uid
+
+    def __get_command_by_uid(self, uid):
+        """
+        Returns the registered command with the given uid.
+
+        :param int uid: The unique id of the command.
+
+        :returns: The registered command ``dict``, or None if no command with
+            the uid is registered.
+        """
+        if self.__command_dispatch is None:
+            self.__command_dispatch = dict(
+                (command.get("properties", dict()).get("uid"), command)
+                for command in self.commands.values()
+            )
+
+        return self.__command_dispatch.get(uid)
 
     def __get_icon_path(self, properties):
         """
@@ -1358,6 +2120,9 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
         If neither of these is found, fall back to the standard
         `properties["icon"]`.
+
+        The returned icon is scaled to the panel's display size and cached, see
+        :class:`IconCache`.
         """
 
         icon_path = None
@@ -1373,58 +2138,212 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
             # if no dark icon, check the light:
             if not icon_path and light:
-                icon_path = dark.get("png", icon_path)
+                icon_path = light.get("png", icon_path)
 
         # still no icon path, fall back to regular icon
         if not icon_path:
             icon_path = properties.get("icon")
 
-        return icon_path
+        # hand the panel a pre-processed version of the icon
+        return self.__icon_cache.get(icon_path)
 
-    def __send_state(self):
+    def __on_state_requested(self):
+        """
+        Handles a state request from the panel. The panel asks for the state
+        after it has been (re)loaded, so everything is sent regardless of what
+        was sent previously.
+        """
+        self.__schedule_send_state(force=True)
+
+    def __schedule_send_state(self, force=False):
+        """
+        Schedules the current state to be sent back to javascript.
+
+        The state is sent on the next turn of the event loop. Requests made
+        before then, or while the state is being sent, are coalesced into a
+        single send so that back-to-back requests don't cancel each other's
+        work.
+
+        :param bool force: If True, the full state is sent even if the panel
+            already has the current commands.
+        """
+        self.__send_state_forced = self.__send_state_forced or force
+
+        if self.__send_state_scheduled:
+            self.__send_state_coalesced += 1
+            self.logger.debug(
+                "State send already scheduled. Redundant sends avoided: %d"
+                % (self.__send_state_coalesced,)
+            )
+            return
+
+        self.__send_state_scheduled = True
+
+        # if the state is currently being sent, the send will be scheduled
+        # again once that completes.
+        if not self.__sending_state:
+            from sgtk.platform.qt import QtCore
+
+            QtCore.QTimer.singleShot(0, self.__run_scheduled_send_state)
+
+    def __run_scheduled_send_state(self):
+        """
+        Sends the state scheduled by :meth:`__schedule_send_state`.
+        """
+        if not self.__send_state_scheduled:
+            # the scheduled send was cancelled
+            return
+
+        force = self.__send_state_forced
+        self.__send_state_scheduled = False
+        self.__send_state_forced = False
+
+        # waiting on RPC responses processes Qt events, so requests can come in
+        # while the state is being sent.
+        self.__sending_state = True
+        try:
+            self.__send_state(force=force)
+        finally:
+            self.__sending_state = False
+
+            # requests made during the send didn't start a timer. it has to be
+            # started even if the send failed, otherwise no state would ever
+            # be sent again.
+            if self.__send_state_scheduled:
+                from sgtk.platform.qt import QtCore
+
+                QtCore.QTimer.singleShot(0, self.__run_scheduled_send_state)
+
+    def __send_state(self, force=False):
         """
         Sends information back to javascript representing the current context.
+
+        The commands are only sent if they differ from those last sent to the
+        panel, unless ``force`` is True.
+
+        :param bool force: If True, the full state is sent even if the panel
+            already has the current commands.
         """
-        # alert js that the state is about to change. this allows the panel to
-        # clear its current state and display a loading message.
-        self.adobe.context_about_to_change()
+        # the engine already has access to all the commands that need to be
+        # displayed for the current context, so build those up front to know
+        # whether the panel needs them at all.
+        all_commands = self.__get_commands_state()
 
-        # ---- process the context for display
+        if force or self.__sent_commands_state is None:
+            commands_changed = True
+        else:
+            commands_changed = all_commands != self.__sent_commands_state
 
-        # clear existing context requests to prevent unnecessary processing
-        self.__context_find_uid = None
-        self.__context_thumb_uid = None
-        self.__sg_data.clear()
+        if commands_changed:
+            # alert js that the state is about to change. this allows the panel
+            # to clear its current state and display a loading message.
+            self.adobe.context_about_to_change()
+
+        # ---- process the context for display
 
         # determine the best entity to show for the current context
         context_entity = self.__get_context_entity()
 
-        # this will inspect the context and do any additional queries for fields
-        # that are required to show it
-        self.__request_context_display(context_entity)
+        if not commands_changed and self.__is_context_display_in_flight(context_entity):
+            # the request already made for this entity will display it once it
+            # completes, so there's no need to start over. the panel cleared
+            # its header if the commands changed, so it has to be requested
+            # again in that case.
+            self.logger.debug(
+                "Context display already requested for %s." % (context_entity,)
+            )
+        else:
+            # clear existing context requests to prevent unnecessary processing
+            self.__context_find_uid = None
+            self.__context_thumb_uid = None
+            self.__cancel_prefetch()
+            self.__sg_data.clear()
+
+            # this will inspect the context and do any additional queries for
+            # fields that are required to show it
+            self.__context_display_entity = context_entity
+            self.__request_context_display(context_entity)
+
+        # ---- send the commands back separately
+
+        if not commands_changed:
+            self.logger.debug("Commands unchanged, not sending them to the panel.")
+            return
+
+        if self.__sent_commands_state is not None and not force:
+            (added, removed, changed) = self.__diff_commands_state(
+                self.__sent_commands_state, all_commands
+            )
+            self.logger.debug(
+                "Sending commands to the panel: %d added, %d removed, %d changed."
+                % (len(added), len(removed), len(changed))
+            )
+
+        # send the commands back to adobe
+        self.adobe.send_commands(all_commands)
+        self.__sent_commands_state = all_commands
+
+    def __get_commands_state(self):
+        """
+        Returns the structure describing the registered commands to display in
+        the panel.
 
-        # ---- the engine already has access to all the commands that need to
-        #      be display for the current context. so go ahead and process those
-        #      and send them back separately
+        The structure only depends on the environment, the registered commands
+        and the favorites configured for the engine, along with whether the
+        context has filesystem locations. Structures built for previously seen
+        combinations of those are reused as is.
 
-        # first, we'll process the menu favorites
-        fav_lookup = {}
-        fav_index = 0
+        Commands are identified by their app instance name and name, which
+        don't change when the apps register them again after a context change.
+        Their uids are stable too, see :meth:`register_command`, and are part
+        of the key since they are part of the structure.
+
+        :returns: A ``dict`` with ``favorites``, ``commands`` and
+            ``context_menu_cmds`` lists of command dictionaries.
+        """
+        command_ids = []
+        for command_name, command_info in self.commands.items():
+            properties = command_info.get("properties", {})
+            app_name = getattr(properties.get("app"), "instance_name", None)
+            command_ids.append((app_name, command_name, properties.get("uid")))
+
+        cache_key = (
+            self.environment["name"],
+            frozenset(command_ids),
+            tuple(
+                (fav_command["app_instance"], fav_command["name"])
+                for fav_command in self.get_setting("shelf_favorites")
+            ),
+            bool(self.context.filesystem_locations),
+        )
+
+        all_commands = self.__commands_state_cache.get(cache_key)
+
+        if all_commands is not None:
+            self.logger.debug(
+                "Reusing commands for environment '%s' from the cache."
+                % (cache_key[0],)
+            )
+            self.__commands_state_cache.move_to_end(cache_key)
+            return all_commands
 
-        # create a lookup of the combined app instance name with the display
-        # name. that should be unique and provide an easy lookup to match
-        # against. we'll remember the order processed in order to sort our
-        # favorites list once all the registered commands are processed
-        for fav_command in self.get_setting("shelf_favorites"):
-            app_instance_name = fav_command["app_instance"]
-            display_name = fav_command["name"]
+        all_commands = self.__build_commands_state()
 
-            # build unique lookup for this combo of app instance and command
-            fav_id = app_instance_name + display_name
-            fav_lookup[fav_id] = fav_index
+        self.__commands_state_cache[cache_key] = all_commands
+        if len(self.__commands_state_cache) > self._COMMANDS_STATE_CACHE_SIZE:
+            self.__commands_state_cache.popitem(last=False)
 
-            # give it an index so that we can sort and maintain order later
-            fav_index += 1
+        return all_commands
+
+    def __build_commands_state(self):
+        """
+        Builds the structure describing the registered commands to display in
+        the panel.
+
+        :returns: A ``dict`` with ``favorites``, ``commands`` and
+            ``context_menu_cmds`` lists of command dictionaries.
+        """
+        fav_lookup = self.__get_favorites_lookup()
 
         # keep a list of each type of command since they'll be displayed
         # differently on the adobe side.
@@ -1437,28 +2356,18 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         for command_name, command_info in self.commands.items():
             # commands come with a dict of properties that may or may not
             # contain certain data.
-            properties = command_info.get("properties", {})
-
-            # ---- determine the app's instance name
+            metadata = self.__get_command_metadata(command_info.get("properties", {}))
 
-            app_instance = properties.get("app", None)
-            app_name = None
-
-            # check this command's app against the engine's apps.
-            if app_instance:
-                for app_instance_name, app_instance_obj in self.apps.items():
-                    if app_instance_obj == app_instance:
-                        app_name = app_instance_name
-
-            cmd_type = properties.get("type", "default")
+            app_name = metadata["app_name"]
+            cmd_type = metadata["type"]
 
             # create the command dict to hand over to adobe
             command = dict(
-                uid=properties.get("uid"),
+                uid=metadata["uid"],
                 display_name=command_name,
-                icon_path=self.__get_icon_path(properties),
-                description=properties.get("description"),
-                type=properties.get("type", "default"),
+                icon_path=metadata["icon_path"],
+                description=metadata["description"],
+                type=cmd_type,
             )
 
             # build the lookup string to see if this app is a favorite
@@ -1486,7 +2395,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
             dict(
                 uid=self.__jump_to_sg_command_id,
                 display_name="Jump to Flow Production Tracking",
-                icon_path=sg_icon,
+                icon_path=self.__icon_cache.get(sg_icon),
                 description="Open the current context in a web browser.",
                 type="context_menu",
             )
@@ -1502,7 +2411,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
                 dict(
                     uid=self.__jump_to_fs_command_id,
                     display_name="Jump to File System",
-                    icon_path=fs_icon,
+                    icon_path=self.__icon_cache.get(fs_icon),
                     description="Open the current context in a file browser.",
                     type="context_menu",
                 )
@@ -1524,14 +2433,105 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
         # ---- populate the state structure to hand over to adobe
 
-        all_commands = {
+        return {
             "favorites": favorites,
             "commands": commands,
             "context_menu_cmds": context_menu_cmds,
         }
 
-        # send the commands back to adobe
-        self.adobe.send_commands(all_commands)
+    def __get_favorites_lookup(self):
+        """
+        Returns a lookup of the favorite commands configured for the engine.
+
+        :returns: A ``dict`` mapping the combined app instance name and command
+            name of each favorite to its position on the shelf.
+        """
+        if self.__favorites_lookup is None:
+            fav_lookup = {}
+            fav_index = 0
+
+            # create a lookup of the combined app instance name with the display
+            # name. that should be unique and provide an easy lookup to match
+            # against. we'll remember the order processed in order to sort our
+            # favorites list once all the registered commands are processed
+            for fav_command in self.get_setting("shelf_favorites"):
+                app_instance_name = fav_command["app_instance"]
+                display_name = fav_command["name"]
+
+                # build unique lookup for this combo of app instance and command
+                fav_id = app_instance_name + display_name
+                fav_lookup[fav_id] = fav_index
+
+                # give it an index so that we can sort and maintain order later
+                fav_index += 1
+
+            self.__favorites_lookup = fav_lookup
+
+        return self.__favorites_lookup
+
+    def __get_command_metadata(self, properties):
+        """
+        Returns the metadata needed to display a registered command in the
+        panel. The metadata is indexed by command uid the first time it is
+        requested.
+
+        :param dict properties: The registered command's properties.
+
+        :returns: A ``dict`` with the command's ``uid``, ``app_name``,
+            ``icon_path``, ``description`` and ``type``.
+        """
+        uid = properties.get("uid")
+        metadata = self.__command_index.get(uid)
+
+        if metadata is None:
+            # the app instance name is used to match the command against the
+            # favorites. commands registered by the engine itself have no app.
+            app_instance = properties.get("app", None)
+            app_name = getattr(app_instance, "instance_name", None)
+
+            metadata = dict(
+                uid=uid,
+                app_name=app_name,
+                icon_path=self.__get_icon_path(properties),
+                description=properties.get("description"),
+                type=properties.get("type", "default"),
+            )
+            self.__command_index[uid] = metadata
+
+        return metadata
+
+    def __diff_commands_state(self, old_state, new_state):
+        """
+        Compares two command structures as returned by
+        :meth:`__build_commands_state`.
+
+        :param dict old_state: The previous command structure.
+        :param dict new_state: The new command structure.
+
+        :returns: A tuple of the uids of the added, removed and changed
+            commands. A command that moved to a different list counts as
+            changed.
+        """
+
+        def _commands_by_uid(state):
+            commands_by_uid = {}
+            for section, commands in state.items():
+                for command in commands:
+                    commands_by_uid[command["uid"]] = (section, command)
+            return commands_by_uid
+
+        old_commands = _commands_by_uid(old_state)
+        new_commands = _commands_by_uid(new_state)
+
+        added = [uid for uid in new_commands if uid not in old_commands]
+        removed = [uid for uid in old_commands if uid not in new_commands]
+        changed = [
+            uid
+            for uid in new_commands
+            if uid in old_commands and new_commands[uid] != old_commands[uid]
+        ]
+
+        return (added, removed, changed)
 
     def __setup_connection_timer(self, force=False):
         """
@@ -1607,6 +2607,113 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
             if exit_code != 0:
                 self.logger.error("Failed to launch '%s'!" % cmd)
 
+    def __get_document_change_token(self, document_id):
+        """
+        Returns a token identifying the current state of the given document.
+
+        Photoshop doesn't expose anything that changes on every edit. The
+        history can't tell an undone edit from a new edit of the same kind, and
+        loses its oldest states once it is full. So only documents with no
+        unsaved changes get a token, built from the path and modification time
+        of the file they match. Those change whenever the document is saved or
+        the file is modified on disk.
+
+        :param int document_id: The id of the document.
+
+        :returns: A ``tuple``, or None if the document has unsaved changes or
+            has never been saved.
+        """
+        result = self.adobe.rpc_eval(
+            """
+            (function (documentId) {
+                for (var i = 0; i < app.documents.length; i++) {
+                    var doc = app.documents[i];
+                    if (doc.id != documentId) {
+                        continue;
+                    }
+                    if (!doc.saved) {
+                        return "";
+                    }
+                    try {
+                        return doc.fullName.fsName;
+                    } catch (e) {
+                        // the document has never been saved
+                        return "";
+                    }
+                }
+                return "";
+            })(%d);
+            """
+            % (document_id,)
+        )
+
+        if not result:
+            return None
+
+        path = str(result)
+
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        return (document_id, path, mtime)
+
+    def __cache_document_thumbnail(self, document_id, change_token, jpeg_path):
+        """
+        Keeps a copy of a thumbnail generated for a document, to be reused
+        until the document changes.
+
+        :param int document_id: The id of the document.
+        :param tuple change_token: The document state the thumbnail shows.
+        :param str jpeg_path: The path to the generated thumbnail.
+        """
+        if not self.__document_thumbnails_folder:
+            self.__document_thumbnails_folder = self.__scratch_space.create_folder(
+                "thumbnails"
+            )
+
+        cached_path = os.path.join(
+            self.__document_thumbnails_folder, "%s_sgtk_thumb.jpg" % uuid.uuid4().hex
+        )
+        shutil.copyfile(jpeg_path, cached_path)
+
+        (_, previous_path) = self.__document_thumbnails.get(document_id, (None, None))
+        self.__document_thumbnails[document_id] = (change_token, cached_path)
+
+        if previous_path:
+            try:
+                os.remove(previous_path)
+            except OSError:
+                pass
+
+    def __get_scratch_jpeg_path(self):
+        """
+        Returns a path in the scratch space to write a jpeg file to, which the
+        caller takes ownership of. The file is removed when the engine shuts
+        down at the latest.
+
+        All the files are written to the same scratch folder, created the
+        first time, so that no folder is left behind once the callers have
+        removed their files.
+        """
+        if not self.__exports_folder:
+            self.__exports_folder = self.__scratch_space.create_folder("export")
+
+        return os.path.join(self.__exports_folder, "%s_sgtk.jpg" % uuid.uuid4().hex)
+
+    def __remove_scratch_file(self, path):
+        """
+        Removes a file written to the scratch space which won't be handed
+        over to the caller, e.g. because the operation writing it failed.
+
+        :param str path: The path to the file.
+        """
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
     ##########################################################################################
     # context data methods
 
@@ -1620,33 +2727,276 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
         :param str path: The document path to add to the cache.
         :param context: The context object to associate with the document.
         """
-        if path not in self._CONTEXT_CACHE:
-            # We're storing the context cache in a sgtk user setting at the project
-            # level. This will ensure that when we read the cache back, we'll only
-            # be getting contexts in our current project. Anything outside of that
-            # scope would be unusable, as we don't allow context changing across
-            # project boundaries.
-            self._CONTEXT_CACHE[path] = context
+        if self.__add_context_cache_entry(path, context):
+            self.__store_context_cache()
 
-            serial_cache = dict()
-            for k, v in self._CONTEXT_CACHE.items():
-                serial_cache[k] = v.serialize()
+    def resolve_contexts(self, paths):
+        """
+        Resolves the contexts of several document paths in a single pass.
 
-            self.logger.debug("Storing context cache: %s" % serial_cache)
-            self.__settings_manager.store(
-                self._CONTEXT_CACHE_KEY,
-                serial_cache,
-                self.__settings_manager.SCOPE_PROJECT,
+        Paths found in the context cache are served from it. The remaining
+        paths are grouped by the pipeline configuration they belong to and by
+        the folder that contains them, and each folder is only looked up once.
+        This relies on ``context_from_path`` only walking the path cache
+        entries of the folders above the document, never the document file
+        itself, so documents sharing a folder resolve to the same context given
+        the same previous context, which is the engine's current context for
+        the whole batch. The results are added to the context cache, which is
+        then stored once for the whole batch.
+
+        :param list paths: The document paths to resolve.
+
+        :returns: A ``dict`` mapping each path to its context, or to None if
+            no context could be determined for it.
+        """
+        start_time = time.time()
+        contexts = dict()
+        unresolved = dict()
+        cache_misses = 0
+        folder_lookups = 0
+
+        for path in paths:
+            path = str(path)
+            context = self.__get_from_context_cache(path)
+            if context:
+                contexts[path] = context
+                continue
+
+            cache_misses += 1
+
+            try:
+                tk = self.__get_sgtk_from_path(path)
+            except Exception as e:
+                self.logger.debug(
+                    "Unable to find a configuration for %s: %s" % (path, e)
+                )
+                contexts[path] = None
+                continue
+
+            folders = unresolved.setdefault(tk, dict())
+            folders.setdefault(os.path.dirname(path), []).append(path)
+
+        cache_updated = False
+        for tk, folders in unresolved.items():
+            for folder_paths in folders.values():
+                folder_lookups += 1
+                try:
+                    context = tk.context_from_path(
+                        folder_paths[0],
+                        previous_context=self.context,
+                    )
+                except Exception as e:
+                    self.logger.debug(
+                        "Unable to determine context from %s: %s" % (folder_paths[0], e)
+                    )
+                    context = None
+
+                for path in folder_paths:
+                    contexts[path] = context
+                    if context and self.__add_context_cache_entry(path, context):
+                        cache_updated = True
+
+        if cache_updated:
+            self.__store_context_cache()
+
+        self.logger.debug(
+            "Resolved %d contexts (%d cache misses, %d folder lookups) in %.3f "
+            "seconds."
+            % (
+                len(contexts),
+                cache_misses,
+                folder_lookups,
+                time.time() - start_time,
+            )
+        )
+        return contexts
+
+    def __add_context_cache_entry(self, path, context):
+        """
+        Adds the given document path to the in-memory context cache and to the
+        shared context store, if enabled, unless a valid entry already exists.
+
+        :param str path: The document path to add to the cache.
+        :param context: The context object to associate with the document.
+
+        :returns: True if the cache was updated, False otherwise.
+        """
+        entry = self._CONTEXT_CACHE.get(path)
+
+        if entry is not None and entry.is_valid(self.get_setting("context_cache_ttl")):
+            return False
+
+        entry = self.__tk_photoshopcc.ContextCacheEntry.from_context(path, context)
+        self._CONTEXT_CACHE[path] = entry
+
+        if self.__shared_context_store:
+            self.__shared_context_store.set(
+                path, self.__get_project_id(), entry.to_dict()
             )
 
+        return True
+
+    def __store_context_cache(self):
+        """
+        Stores the serialized context cache as a user setting for use during
+        panel extension restarts.
+        """
+        # We're storing the context cache in a sgtk user setting at the project
+        # level. This will ensure that when we read the cache back, we'll only
+        # be getting contexts in our current project. Anything outside of that
+        # scope would be unusable, as we don't allow context changing across
+        # project boundaries.
+        serial_cache = dict()
+        for k, v in self._CONTEXT_CACHE.items():
+            serial_cache[k] = v.to_dict()
+
+        self.logger.debug("Storing context cache: %s" % serial_cache)
+        self.__settings_manager.store(
+            self._CONTEXT_CACHE_KEY,
+            serial_cache,
+            self.__settings_manager.SCOPE_PROJECT,
+        )
+
     def __get_from_context_cache(self, path):
         """
         Gets the document path's associated context object, if one has been cached.
 
+        Cached entries are validated against the document on disk and the
+        configured time to live. Stale entries are dropped from the cache so
+        that the context gets resolved again. If the path isn't in the
+        in-memory cache, the shared context store is checked, if enabled.
+
         :returns: Context object, or None
         """
-        self.logger.debug("Getting path from context cache (%s): %s" % (path, self._CONTEXT_CACHE))
-        return self._CONTEXT_CACHE.get(path)
+        self.logger.debug(
+            "Getting path from context cache (%s): %s" % (path, self._CONTEXT_CACHE)
+        )
+        entry = self._CONTEXT_CACHE.get(path)
+
+        if entry is None:
+            entry = self.__get_from_shared_context_store(path)
+            if entry is None:
+                return None
+
+        if not entry.is_valid(self.get_setting("context_cache_ttl")):
+            self.logger.debug("Discarding stale context cache entry: %r" % entry)
+            self.__discard_context_cache_entry(path)
+            return None
+
+        # restored entries hold a serialized context until first accessed
+        try:
+            context = entry.context
+        except Exception as e:
+            self.logger.debug("Unable to restore cached context for %s: %s" % (path, e))
+            self.__discard_context_cache_entry(path)
+            return None
+
+        self._CONTEXT_CACHE[path] = entry
+        return context
+
+    def __discard_context_cache_entry(self, path):
+        """
+        Removes the given document path from the in-memory context cache and
+        from the shared context store, if enabled.
+
+        :param str path: The document path to discard.
+        """
+        self._CONTEXT_CACHE.pop(path, None)
+        if self.__shared_context_store:
+            self.__shared_context_store.delete(path, self.__get_project_id())
+
+    def __get_from_shared_context_store(self, path):
+        """
+        Gets the document path's context cache entry from the shared context
+        store, if the store is enabled and holds an entry for the path.
+
+        :param str path: The document path to look up.
+
+        :returns: A context cache entry, or None
+        """
+        if not self.__shared_context_store:
+            return None
+
+        data = self.__shared_context_store.get(path, self.__get_project_id())
+        if data is None:
+            return None
+
+        entry = self.__tk_photoshopcc.ContextCacheEntry.from_dict(path, data)
+        self.logger.debug("Document found in shared context store: %r" % entry)
+        return entry
+
+    def __get_sgtk_from_path(self, path):
+        """
+        Returns an Sgtk instance that is able to resolve the given path.
+
+        Nearly every document belongs to the project the engine is already
+        running in, so the engine's own instance is reused whenever the path
+        lives under its roots. Otherwise, previously created instances are
+        checked before falling back to ``sgtk.sgtk_from_path``, which has to
+        re-discover the pipeline configuration on disk. Instances created that
+        way are cached by pipeline configuration root.
+
+        :param str path: The path to get an Sgtk instance for.
+
+        :returns: An Sgtk instance.
+        """
+        if self.__is_path_under_roots(path, self.sgtk):
+            return self.sgtk
+
+        for tk in self._SGTK_CACHE.values():
+            if self.__is_path_under_roots(path, tk):
+                return tk
+
+        tk = sgtk.sgtk_from_path(path)
+
+        # The path may still have resolved to a configuration we know about,
+        # in which case we keep using the existing instance.
+        config_root = tk.pipeline_configuration.get_path()
+        return self._SGTK_CACHE.setdefault(config_root, tk)
+
+    def __is_path_under_roots(self, path, tk):
+        """
+        Checks whether the given path lives under one of the project roots of
+        the supplied Sgtk instance.
+
+        :param str path: The path to check.
+        :param tk: The Sgtk instance whose roots should be checked.
+
+        :returns: True if the path is under one of the roots, False otherwise.
+        """
+        norm_path = os.path.normcase(os.path.normpath(path))
+
+        for root in tk.roots.values():
+            if not root:
+                continue
+
+            norm_root = os.path.normcase(os.path.normpath(root))
+            if norm_path == norm_root or norm_path.startswith(
+                norm_root.rstrip(os.sep) + os.sep
+            ):
+                return True
+
+        return False
+
+    def __is_context_display_in_flight(self, entity):
+        """
+        Checks whether the query for the fields displayed in the context header
+        currently in flight was made for the given entity.
+
+        A thumbnail download still in flight doesn't count, since the fields
+        have already been displayed by then and wouldn't be sent again.
+
+        :param dict entity: The entity to display, or None for the site.
+
+        :returns: True if the query for the entity is still in flight.
+        """
+        if self.__context_find_uid is None:
+            return False
+
+        def _entity_key(e):
+            return (e["type"], e["id"]) if e else None
+
+        return _entity_key(entity) == _entity_key(self.__context_display_entity)
 
     def __request_context_display(self, entity):
         """
@@ -1657,9 +3007,7 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
         if not entity:
             # no entity. this will retrieve the html to display for the site.
-            fields_html = self.execute_hook_method(
-                "context_fields_display_hook",
-                "get_context_html",
+            fields_html = self.__get_context_fields_display_hook().get_context_html(
                 entity=None,
                 sg_globals=self.__shotgun_globals,
             )
@@ -1673,35 +3021,399 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
             self.adobe.send_context_thumbnail(data)
             return
 
+        entity_type = entity["type"]
+        entity_id = entity["id"]
+
+        # display what was cached for the entity straight away. if it is still
+        # fresh there is nothing else to do, otherwise it is displayed while
+        # being refreshed in the background.
+        cached_header = self.__header_cache.get(entity_type, entity_id)
+
+        if cached_header and cached_header["html"]:
+            self.logger.debug("Displaying cached context header for %s." % (entity,))
+            self.adobe.send_context_display(cached_header["html"])
+
+            # the default thumbnails are relative to the panel, downloaded ones
+            # may have been cleaned up since they were cached.
+            thumb_path = cached_header["thumb_path"]
+            if thumb_path and (
+                not os.path.isabs(thumb_path) or os.path.exists(thumb_path)
+            ):
+                self.adobe.send_context_thumbnail(
+                    dict(
+                        thumb_path=thumb_path,
+                        url=self.get_entity_url(entity),
+                    )
+                )
+
+            if self.__header_cache.is_fresh(cached_header):
+                self.__start_prefetch()
+                return
+
         # get the fields to query from the hook
-        fields = self.execute_hook_method(
-            "context_fields_display_hook",
-            "get_entity_fields",
-            entity_type=entity["type"],
+        fields = self.__get_context_fields_display_hook().get_entity_fields(
+            entity_type=entity_type,
         )
 
         # always try to query the image for the entity
         if "image" not in fields:
             fields.append("image")
 
-        entity_type = entity["type"]
-        entity_id = entity["id"]
-
         # kick off an async request to query the necessary fields
         self.__context_find_uid = self.__sg_data.execute_find_one(
             entity_type, [["id", "is", entity_id]], fields
         )
 
+    def __start_prefetch(self):
+        """
+        Starts prefetching the context headers of the other open documents, so
+        that switching to one of them displays its header immediately.
+
+        The contexts of the open documents are taken from the context cache.
+        Only the open documents are looked up, so that the contexts cached for
+        closed documents aren't restored for nothing. Entities with a fresh
+        cached header are skipped. Only a few requests are made at once so that
+        prefetching never holds up requests for the current context.
+        """
+        self.__cancel_prefetch()
+
+        current_entity = self.__get_context_entity()
+        queued = set()
+
+        for path in self.__get_open_document_paths():
+            context = self.__get_from_context_cache(path)
+            if not context:
+                continue
+
+            entity = context.task or context.entity or context.project
+            if not entity or entity == current_entity:
+                continue
+
+            entity_key = (entity["type"], entity["id"])
+            if entity_key in queued:
+                continue
+
+            cached_header = self.__header_cache.get(*entity_key)
+            if cached_header and self.__header_cache.is_fresh(cached_header):
+                continue
+
+            queued.add(entity_key)
+            self.__prefetch_queue.append(entity)
+
+        if self.__prefetch_queue:
+            self.logger.debug(
+                "Prefetching %d context headers." % (len(self.__prefetch_queue),)
+            )
+            self.__submit_prefetch_requests()
+
+    def __get_open_document_paths(self):
+        """
+        Returns the paths of the documents open in Photoshop, retrieved in a
+        single call. Documents which have never been saved are left out.
+
+        :returns: A ``list`` of paths.
+        """
+        result = self.adobe.rpc_eval(
+            """
+            (function () {
+                var paths = [];
+                for (var i = 0; i < app.documents.length; i++) {
+                    try {
+                        paths.push(app.documents[i].fullName.fsName);
+                    } catch (e) {
+                        // the document has never been saved
+                    }
+                }
+                return paths.join("\\n");
+            })();
+            """
+        )
+
+        if not result:
+            return []
+
+        return str(result).split("\n")
+
+    def __submit_prefetch_requests(self):
+        """
+        Submits queued prefetch requests, up to the maximum number of prefetch
+        requests allowed in flight.
+
+        Thumbnail downloads are submitted first, since they complete headers
+        whose fields are already cached. Queued entities are grouped by entity
+        type, and the fields for each group are queried with a single request.
+        """
+        while (
+            self.__prefetch_thumbnail_queue
+            and len(self.__prefetch_requests) < self._MAX_PREFETCH_REQUESTS
+        ):
+            sg_entity = self.__prefetch_thumbnail_queue.pop(0)
+
+            uid = self.__sg_data.request_thumbnail(
+                sg_entity["image"],
+                sg_entity["type"],
+                sg_entity["id"],
+                "image",
+                load_image=False,
+            )
+            self.__prefetch_requests[uid] = [sg_entity]
+
+        while (
+            self.__prefetch_queue
+            and len(self.__prefetch_requests) < self._MAX_PREFETCH_REQUESTS
+        ):
+            entity_type = self.__prefetch_queue[0]["type"]
+
+            entities = [e for e in self.__prefetch_queue if e["type"] == entity_type]
+            entities = entities[: self._PREFETCH_BATCH_SIZE]
+            for entity in entities:
+                self.__prefetch_queue.remove(entity)
+
+            fields = self.__get_context_fields_display_hook().get_entity_fields(
+                entity_type=entity_type,
+            )
+            if "image" not in fields:
+                fields.append("image")
+
+            uid = self.__sg_data.execute_find(
+                entity_type, [["id", "in", [e["id"] for e in entities]]], fields
+            )
+            self.__prefetch_requests[uid] = entities
+
+    def __cancel_prefetch(self):
+        """
+        Cancels any pending and in-flight context header prefetching.
+        """
+        for uid in self.__prefetch_requests:
+            self.__sg_data.stop_work(uid)
+
+        self.__prefetch_queue = []
+        self.__prefetch_thumbnail_queue = []
+        self.__prefetch_requests = {}
+
+    def __on_prefetch_completed(self, uid, data):
+        """
+        Caches the result of a context header prefetch request, then submits
+        the next queued requests.
+
+        :param uid: The uid of the completed request.
+        :param dict data: The data returned by the request.
+        """
+        entities = self.__prefetch_requests.pop(uid)
+
+        if "sg" in data:
+            # the fields of a batch of entities of the same type. hand each
+            # entity's values to the hook separately.
+            for sg_entity in data["sg"] or []:
+                # html rendered with raw values isn't worth caching. the entity
+                # will be cached once rendered with its project's schema.
+                (fields_html, rendered) = self.__render_context_html(sg_entity)
+                if rendered:
+                    self.__header_cache.update(
+                        sg_entity["type"],
+                        sg_entity["id"],
+                        entity=sg_entity,
+                        html=fields_html,
+                    )
+
+                if sg_entity.get("image"):
+                    thumb_path = self.__thumbnail_cache.get(
+                        sg_entity["type"], sg_entity["id"], sg_entity["image"]
+                    )
+                    if thumb_path:
+                        self.__header_cache.update(
+                            sg_entity["type"], sg_entity["id"], thumb_path=thumb_path
+                        )
+                    else:
+                        # the thumbnail download is part of the prefetch
+                        self.__prefetch_thumbnail_queue.append(sg_entity)
+                else:
+                    self.__header_cache.update(
+                        sg_entity["type"],
+                        sg_entity["id"],
+                        thumb_path=self.__get_default_thumb_path(sg_entity["type"]),
+                    )
+        else:
+            sg_entity = entities[0]
+            self.__header_cache.update(
+                sg_entity["type"],
+                sg_entity["id"],
+                thumb_path=self.__cache_thumbnail(sg_entity, data.get("thumb_path")),
+            )
+
+        self.__submit_prefetch_requests()
+
+    def __cache_thumbnail(self, sg_entity, thumb_path):
+        """
+        Adds a downloaded entity thumbnail to the thumbnail cache.
+
+        :param dict sg_entity: The entity, including its ``image`` url.
+        :param str thumb_path: The path to the downloaded thumbnail.
+
+        :returns: The path to the cached thumbnail, or the downloaded
+            thumbnail's path if it couldn't be cached.
+        """
+        if not thumb_path:
+            return thumb_path
+
+        cached_path = self.__thumbnail_cache.add(
+            sg_entity["type"], sg_entity["id"], sg_entity["image"], thumb_path
+        )
+        return cached_path or thumb_path
+
+    def __load_schema(self, project_id):
+        """
+        Asks sg globals to load the schema for the given project, unless it is
+        already loaded or loading. Never blocks on the schema being loaded.
+
+        :param project_id: The project id, or None for the site schema.
+        """
+        if (
+            project_id in self.__schema_loaded_projects
+            or project_id in self.__pending_header_renders
+        ):
+            return
+
+        self.__pending_header_renders[project_id] = OrderedDict()
+
+        def _on_schema_loaded():
+            self.__on_schema_loaded(project_id)
+
+        # sg globals will run the callback immediately if the schema is
+        # already cached.
+        self.__shotgun_globals.run_on_schema_loaded(
+            _on_schema_loaded, project_id=project_id
+        )
+
+    def __on_schema_loaded(self, project_id):
+        """
+        Renders the context headers queued while the schema of the given
+        project was loading again, this time with display names.
+
+        :param project_id: The id of the project whose schema was loaded.
+        """
+        self.__schema_loaded_projects.add(project_id)
+        pending_entities = self.__pending_header_renders.pop(project_id, {})
+
+        if not pending_entities:
+            return
+
+        self.logger.debug(
+            "Schema loaded for project %s. Rendering %d queued context headers."
+            % (project_id, len(pending_entities))
+        )
+
+        context_entity = self.__get_context_entity()
+
+        for sg_entity in pending_entities.values():
+            (fields_html, _) = self.__render_context_html(sg_entity)
+
+            self.__header_cache.update(
+                sg_entity["type"],
+                sg_entity["id"],
+                entity=sg_entity,
+                html=fields_html,
+            )
+
+            if context_entity and (context_entity["type"], context_entity["id"]) == (
+                sg_entity["type"],
+                sg_entity["id"],
+            ):
+                self.adobe.send_context_display(fields_html)
+
+        self.__header_cache.flush()
+
+    def __render_context_html(self, sg_entity):
+        """
+        Renders the context header html for the given entity.
+
+        If the schema of the entity's project isn't loaded yet, the html is
+        rendered with raw field values instead of blocking until it is, and the
+        entity is queued to be rendered again once the schema is loaded.
+
+        :param dict sg_entity: The entity, populated with the queried fields.
+
+        :returns: A tuple of the html and whether it was rendered with the
+            schema's display names.
+        """
+        if sg_entity["type"] == "Project":
+            project_id = sg_entity["id"]
+        else:
+            project_id = (sg_entity.get("project") or {}).get("id")
+
+        self.__load_schema(project_id)
+
+        if project_id in self.__schema_loaded_projects:
+            sg_globals = self.__shotgun_globals
+            rendered = True
+        else:
+            self.__pending_header_renders[project_id][
+                (sg_entity["type"], sg_entity["id"])
+            ] = sg_entity
+            sg_globals = self.__raw_shotgun_globals
+            rendered = False
+
+        fields_html = self.__get_context_fields_display_hook().get_context_html(
+            entity=sg_entity,
+            sg_globals=sg_globals,
+        )
+        return (fields_html, rendered)
+
+    def __get_context_fields_display_hook(self):
+        """
+        Returns the context fields display hook instance used to render the
+        context header, creating it the first time.
+        """
+        if self.__context_fields_display_hook is None:
+            self.__context_fields_display_hook = self.create_hook_instance(
+                self.get_setting("context_fields_display_hook")
+            )
+        return self.__context_fields_display_hook
+
+    def __get_default_thumb_path(self, entity_type):
+        """
+        Returns the panel's default thumbnail for entities without an image.
+
+        :param str entity_type: The entity type.
+
+        :returns: The thumbnail path, relative to the panel.
+        """
+        if entity_type in ["Asset", "Project", "Shot", "Task"]:
+            return "../images/default_%s_thumb_dark.png" % (entity_type,)
+
+        return "../images/default_Entity_thumb_dark.png"
+
     def __on_worker_failure(self, uid, msg):
         """
         Asynchronous callback - the worker thread errored.
         """
 
+        # prefetching is opportunistic, a failure only means the header will
+        # be queried when its context becomes current.
+        if uid in self.__prefetch_requests:
+            entities = self.__prefetch_requests.pop(uid)
+            self.logger.debug(
+                "Failed to prefetch context headers for %s: %s" % (entities, msg)
+            )
+            self.__submit_prefetch_requests()
+            return
+
         # log a message if the worker failed to retrieve the necessary info.
         if uid == self.__context_find_uid:
             # clear the find id since we are now processing it
             self.__context_find_uid = None
 
+            entity = self.__context_display_entity
+            cached_header = self.__header_cache.get(entity["type"], entity["id"])
+            if cached_header and cached_header["html"]:
+                # a cached header is already displayed. keep it rather than
+                # replacing it with the error.
+                self.logger.warning(
+                    "Failed to refresh context fields, displaying cached "
+                    "values: %s" % (msg,)
+                )
+                return
+
             # send an error message back to the context header.
             self.adobe.send_context_display(
                 """
@@ -1729,32 +3441,38 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
         self.logger.debug("Worker signal: %s" % (data,))
 
+        if uid in self.__prefetch_requests:
+            self.__on_prefetch_completed(uid, data)
+
         # the find query for the context entity with the specified fields
-        if uid == self.__context_find_uid:
+        elif uid == self.__context_find_uid:
             # clear the find id since we are now processing it
             self.__context_find_uid = None
 
             context_entity = data["sg"]
 
-            # should have an image url now. submit a request to download the
-            # entity's thumbnail.
+            # should have an image url now. use the cached thumbnail for it or
+            # submit a request to download the entity's thumbnail.
             if "image" in context_entity and context_entity["image"]:
-                self.__context_thumb_uid = self.__sg_data.request_thumbnail(
-                    context_entity["image"],
+                thumb_path = self.__thumbnail_cache.get(
                     context_entity["type"],
                     context_entity["id"],
-                    "image",
-                    load_image=False,
+                    context_entity["image"],
                 )
+                if not thumb_path:
+                    self.__context_thumb_entity = context_entity
+                    self.__context_thumb_uid = self.__sg_data.request_thumbnail(
+                        context_entity["image"],
+                        context_entity["type"],
+                        context_entity["id"],
+                        "image",
+                        load_image=False,
+                    )
             # no image, use a default image based on the entity type
             else:
-                if context_entity["type"] in ["Asset", "Project", "Shot", "Task"]:
-                    thumb_path = "../images/default_%s_thumb_dark.png" % (
-                        context_entity["type"]
-                    )
-                    data["thumb_path"] = thumb_path
-                else:
-                    thumb_path = "../images/default_Entity_thumb_dark.png"
+                thumb_path = self.__get_default_thumb_path(context_entity["type"])
+
+            if thumb_path:
 
                 data = dict(
                     thumb_path=thumb_path,
@@ -1762,17 +3480,40 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
                 )
                 self.adobe.send_context_thumbnail(data)
 
+                self.__header_cache.update(
+                    context_entity["type"],
+                    context_entity["id"],
+                    thumb_path=thumb_path,
+                )
+
             # now that we have all the field values, go back to the hook and
             # build the html to display them.
-            fields_html = self.execute_hook_method(
-                "context_fields_display_hook",
-                "get_context_html",
-                entity=context_entity,
-                sg_globals=self.__shotgun_globals,
+            (fields_html, rendered) = self.__render_context_html(context_entity)
+
+            cached_header = self.__header_cache.get(
+                context_entity["type"], context_entity["id"]
             )
 
-            # forward the display html back to the js panel
-            self.adobe.send_context_display(fields_html)
+            if rendered:
+                # forward the display html back to the js panel, unless the
+                # cached html already displayed is up to date.
+                if not cached_header or cached_header["html"] != fields_html:
+                    self.adobe.send_context_display(fields_html)
+
+                self.__header_cache.update(
+                    context_entity["type"],
+                    context_entity["id"],
+                    entity=context_entity,
+                    html=fields_html,
+                )
+            elif not cached_header or not cached_header["html"]:
+                # nothing displayed yet. show the raw values until the header
+                # is rendered again once the schema is loaded.
+                self.adobe.send_context_display(fields_html)
+
+            # the current context's header is now displayed, so the other open
+            # documents' headers can be prefetched.
+            self.__start_prefetch()
 
         # thumbnail download. forward the path and a url back to js
         elif uid == self.__context_thumb_uid:
@@ -1781,11 +3522,25 @@ class PhotoshopCCEngine(sgtk.platform.Engine):
 
             context_entity = self.__get_context_entity()
 
+            # hand the panel a downscaled copy of the thumbnail from the cache
+            data["thumb_path"] = self.__cache_thumbnail(
+                self.__context_thumb_entity, data.get("thumb_path")
+            )
+
             # add a url to allow the panel to make the thumbnail clickable
             data["url"] = self.get_entity_url(context_entity)
 
             self.adobe.send_context_thumbnail(data)
 
+            self.__header_cache.update(
+                context_entity["type"],
+                context_entity["id"],
+                thumb_path=data["thumb_path"],
+            )
+
+        # write what the request added to the header cache in one go
+        self.__header_cache.flush()
+
     def __get_project_id(self):
         """Helper method to return the project id for the current context."""
 
@@ -17,6 +17,38 @@ class ContextFieldsDisplay(HookBaseClass):
     Used to control the way the current context fields are displayed.
     """
 
+    # ---- html templates used to render the header
+
+    # the header table. filled with the rendered rows.
+    TABLE_TEMPLATE = "<table>%s</table>"
+
+    # a table row. filled with a label and a value.
+    ROW_TEMPLATE = (
+        "<tr>"
+        "<td class='sg_label_td'>%s:</td>"
+        "<td class='sg_value_td'>%s</td>"
+        "</tr>"
+    )
+
+    # a name followed by a secondary name, such as the shot's sequence
+    QUALIFIED_NAME_TEMPLATE = "%s&nbsp;<span class='sg_label'>(%s)</span>"
+
+    # the shot's cut in/out
+    CUT_TEMPLATE = "%s - %s"
+
+    # the shot's cut in/out, surrounded by its head in/tail out
+    HEAD_TAIL_TEMPLATE = (
+        "<small><span class='sg_label'>%s | </span></small>"
+        "%s"
+        "<small><span class='sg_label'> | %s</span></small>"
+    )
+
+    def __init__(self, *args, **kwargs):
+        super(ContextFieldsDisplay, self).__init__(*args, **kwargs)
+
+        # status display names, keyed by shotgun globals, project id and status
+        self._status_display_names = {}
+
     def get_entity_fields(self, entity_type):
         """
         Given a particular entity type for the current context, return a list of
@@ -142,82 +174,41 @@ class ContextFieldsDisplay(HookBaseClass):
         site_display = site_url.split("//")[-1]
         site_link = self.parent.get_panel_link(site_url, site_display)
 
-        return """
-            <table>
-              <tr>
-                <td class='sg_label_td'>Site:</td>
-                <td class='sg_value_td'>{name}</td>
-              </tr>
-            </table>
-            """.format(
-            name=site_link,
-        )
+        return self._render_table([("Site", site_link)])
 
     def _get_asset_html(self, entity, sg_globals):
         """Returns html for displaying an asset context."""
 
         asset_link = self._get_entity_sg_link(entity["code"], entity)
 
-        status = sg_globals.get_status_display_name(
-            entity["sg_status_list"], project_id=entity["project"]["id"]
+        status = self._get_status_display_name(
+            sg_globals, entity["sg_status_list"], entity["project"]["id"]
         )
 
         # always include name, type, and status
-        html = """
-            <table>
-              <tr>
-                <td class='sg_label_td'>Asset:</td>
-                <td class='sg_value_td'>{name}</td>
-              </tr>
-              <tr>
-                <td class='sg_label_td'>Type:</td>
-                <td class='sg_value_td'>{type}</td>
-              </tr>
-              <tr>
-                <td class='sg_label_td'>Status:</td>
-                <td class='sg_value_td'>{status}</td>
-              </tr>
-            """.format(
-            name=asset_link,
-            type=entity["sg_asset_type"],
-            status=status,
-        )
+        rows = [
+            ("Asset", asset_link),
+            ("Type", entity["sg_asset_type"]),
+            ("Status", status),
+        ]
 
         # tags if there are any
         if entity["tag_list"]:
-            tag_display = ", ".join(entity["tag_list"])
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Tags:</td>
-                  <td class='sg_value_td'>{tags}</td>
-                </tr>
-                """.format(
-                tags=tag_display,
-            )
+            rows.append(("Tags", ", ".join(entity["tag_list"])))
 
         # description if there is one
         if entity["description"]:
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Desc:</td>
-                  <td class='sg_value_td'>{desc}</td>
-                </tr>
-                """.format(
-                desc=entity["description"]
-            )
+            rows.append(("Desc", entity["description"]))
 
-        # close up the table
-        html += "</table>"
-
-        return html
+        return self._render_table(rows)
 
     def _get_shot_html(self, entity, sg_globals):
         """Returns html for displaying a shot context."""
 
         shot_link = self._get_entity_sg_link(entity["code"], entity)
 
-        status = sg_globals.get_status_display_name(
-            entity["sg_status_list"], project_id=entity["project"]["id"]
+        status = self._get_status_display_name(
+            sg_globals, entity["sg_status_list"], entity["project"]["id"]
         )
 
         # by default show the shot url
@@ -227,105 +218,51 @@ class ContextFieldsDisplay(HookBaseClass):
         # display it as a field name to allow shot name to stand out
         seq = entity["sg_sequence"]
         if seq:
-            seq_name = seq["name"]
-            seq_link = self._get_entity_sg_link(seq_name, seq)
-            shot_display = """
-                {name}&nbsp;<span class='sg_label'>({seq_name})</span>
-                """.format(
-                name=shot_link,
-                seq_name=seq_link,
-            )
+            seq_link = self._get_entity_sg_link(seq["name"], seq)
+            shot_display = self.QUALIFIED_NAME_TEMPLATE % (shot_link, seq_link)
 
-        # always include name, type, and status
-        html = """
-            <table>
-              <tr>
-                <td class='sg_label_td'>Shot:</td>
-                <td class='sg_value_td'>{name}</td>
-              </tr>
-              <tr>
-                <td class='sg_label_td'>Status:</td>
-                <td class='sg_value_td'>{status}</td>
-              </tr>
-            """.format(
-            name=shot_display,
-            status=status,
-        )
+        # always include name and status
+        rows = [
+            ("Shot", shot_display),
+            ("Status", status),
+        ]
 
         # tags if there are any
         if entity["tag_list"]:
-            tag_display = ", ".join(entity["tag_list"])
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Tags:</td>
-                  <td class='sg_value_td'>{tags}</td>
-                </tr>
-                """.format(
-                tags=tag_display,
-            )
+            rows.append(("Tags", ", ".join(entity["tag_list"])))
 
         # ---- show some cut info if available
 
-        cut_display = None
-
         # cut in/out
         if entity["sg_cut_in"] is not None and entity["sg_cut_out"] is not None:
-            cut_display = """
-                    {cut_in} - {cut_out}
-                """.format(
-                cut_in=entity["sg_cut_in"], cut_out=entity["sg_cut_out"]
+            cut_display = self.CUT_TEMPLATE % (
+                entity["sg_cut_in"],
+                entity["sg_cut_out"],
             )
 
-        # include head/tail if set
-        if (
-            cut_display
-            and entity["sg_head_in"] is not None
-            and entity["sg_tail_out"] is not None
-        ):
-
-            cut_display = """
-                    <small><span class='sg_label'>{head_in} | </span></small>
-                    {cut_display}
-                    <small><span class='sg_label'> | {tail_out}</span></small>
-                """.format(
-                head_in=entity["sg_head_in"],
-                cut_display=cut_display,
-                tail_out=entity["sg_tail_out"],
-            )
+            # include head/tail if set
+            if entity["sg_head_in"] is not None and entity["sg_tail_out"] is not None:
+                cut_display = self.HEAD_TAIL_TEMPLATE % (
+                    entity["sg_head_in"],
+                    cut_display,
+                    entity["sg_tail_out"],
+                )
 
-        if cut_display:
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Cut:</td>
-                  <td class='sg_value_td'>{cut_display}</td>
-                </tr>
-                """.format(
-                cut_display=cut_display,
-            )
+            rows.append(("Cut", cut_display))
 
         # description if there is one
         if entity["description"]:
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Desc:</td>
-                  <td class='sg_value_td'>{desc}</td>
-                </tr>
-                """.format(
-                desc=entity["description"]
-            )
-
-        # close up the table
-        html += "</table>"
+            rows.append(("Desc", entity["description"]))
 
-        return html
+        return self._render_table(rows)
 
     def _get_task_html(self, entity, sg_globals):
         """Returns html for displaying a task context."""
 
         task_link = self._get_entity_sg_link(entity["content"], entity)
 
-        status = sg_globals.get_status_display_name(
-            entity["sg_status_list"], project_id=entity["project"]["id"]
+        status = self._get_status_display_name(
+            sg_globals, entity["sg_status_list"], entity["project"]["id"]
         )
 
         # by default show the shot url
@@ -334,26 +271,11 @@ class ContextFieldsDisplay(HookBaseClass):
         # include step name next to shot name if not the same.
         # display it as a field name to allow shot name to stand out
         step = entity["step"]
-        if step:
-            step_name = step["name"]
-            if step_name != entity["content"]:
-                task_display = """
-                    {name}&nbsp;<span class='sg_label'>({step_name})</span>
-                    """.format(
-                    name=task_display,
-                    step_name=step_name,
-                )
+        if step and step["name"] != entity["content"]:
+            task_display = self.QUALIFIED_NAME_TEMPLATE % (task_display, step["name"])
 
         # always include name
-        html = """
-            <table>
-              <tr>
-                <td class='sg_label_td'>Task:</td>
-                <td class='sg_value_td'>{name}</td>
-              </tr>
-            """.format(
-            name=task_display
-        )
+        rows = [("Task", task_display)]
 
         # entity
         if entity["entity"]:
@@ -366,62 +288,26 @@ class ContextFieldsDisplay(HookBaseClass):
             linked_entity_link = self._get_entity_sg_link(
                 linked_entity_display, linked_entity
             )
-            html += """
-                  <tr>
-                    <td class='sg_label_td'>{entity_type}:</td>
-                    <td class='sg_value_td'>{name}</td>
-                  </tr>
-                """.format(
-                entity_type=linked_entity["type"],
-                name=linked_entity_link,
-            )
+            rows.append((linked_entity["type"], linked_entity_link))
 
         # always show the status
-        html += """
-              <tr>
-                <td class='sg_label_td'>Status:</td>
-                <td class='sg_value_td'>{status}</td>
-              </tr>
-            """.format(
-            status=status
-        )
+        rows.append(("Status", status))
 
         # artist
         if entity["task_assignees"]:
             assignee_entities = entity["task_assignees"]
-            assignee_links = []
-            for assignee_entity in assignee_entities:
-                asignee_name = assignee_entity["name"]
-                assignee_links.append(
-                    self._get_entity_sg_link(asignee_name, assignee_entity)
-                )
-            assignee_display = ", ".join(assignee_links)
-            assignee_label = "Artists" if len(assignee_entities) > 1 else "Artist"
-            html += """
-                  <tr>
-                    <td class='sg_label_td'>{label}:</td>
-                    <td class='sg_value_td'>{name}</td>
-                  </tr>
-                """.format(
-                label=assignee_label,
-                name=assignee_display,
+            assignee_display = ", ".join(
+                self._get_entity_sg_link(assignee_entity["name"], assignee_entity)
+                for assignee_entity in assignee_entities
             )
+            assignee_label = "Artists" if len(assignee_entities) > 1 else "Artist"
+            rows.append((assignee_label, assignee_display))
 
         # due date
         if entity["due_date"]:
-            html += """
-                  <tr>
-                    <td class='sg_label_td'>Due:</td>
-                    <td class='sg_value_td'>{date}</td>
-                  </tr>
-                """.format(
-                date=entity["due_date"],
-            )
-
-        # close up the table
-        html += "</table>"
+            rows.append(("Due", entity["due_date"]))
 
-        return html
+        return self._render_table(rows)
 
     def _get_entity_html(self, entity, sg_globals):
         """Returns html for displaying a generic entity context."""
@@ -429,50 +315,27 @@ class ContextFieldsDisplay(HookBaseClass):
         # default to name, fall back to code
         entity_display = entity.get("name", entity.get("code"))
         entity_link = self._get_entity_sg_link(entity_display, entity)
-        entity_type = entity["type"]
 
         # always include type/name
-        html = """
-            <table>
-              <tr>
-                <td class='sg_label_td'>{entity_type}:</td>
-                <td class='sg_value_td'>{name}</td>
-              </tr>
-            """.format(
-            entity_type=entity_type,
-            name=entity_link,
-        )
+        rows = [(entity["type"], entity_link)]
 
         # show a status if one can be determined
         status = None
         if "sg_status_list" in entity:
-            status = sg_globals.get_status_display_name(
-                entity["sg_status_list"], project_id=entity.get("project", {}).get("id")
+            status = self._get_status_display_name(
+                sg_globals,
+                entity["sg_status_list"],
+                entity.get("project", {}).get("id"),
             )
         elif "sg_status" in entity:
             status = entity["sg_status"]
 
         if status:
-            html += """
-                  <tr>
-                    <td class='sg_label_td'>Status:</td>
-                    <td class='sg_value_td'>{status}</td>
-                  </tr>
-                """.format(
-                status=status,
-            )
+            rows.append(("Status", status))
 
         # tags if there are any
         if entity["tag_list"]:
-            tag_display = ", ".join(entity["tag_list"])
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Tags:</td>
-                  <td class='sg_value_td'>{tags}</td>
-                </tr>
-                """.format(
-                tags=tag_display,
-            )
+            rows.append(("Tags", ", ".join(entity["tag_list"])))
 
         # description if there is one
         desc = None
@@ -482,19 +345,37 @@ class ContextFieldsDisplay(HookBaseClass):
             desc = entity["sg_description"]
 
         if desc:
-            html += """
-                <tr>
-                  <td class='sg_label_td'>Desc:</td>
-                  <td class='sg_value_td'>{desc}</td>
-                </tr>
-                """.format(
-                desc=desc
-            )
+            rows.append(("Desc", desc))
 
-        # close up the table
-        html += "</table>"
+        return self._render_table(rows)
 
-        return html
+    def _render_table(self, rows):
+        """
+        Returns the html table displaying the given rows.
+
+        :param rows: ``list`` of (label, value) tuples, one per table row.
+        :returns: An html ``str``.
+        """
+        return self.TABLE_TEMPLATE % (
+            "".join([self.ROW_TEMPLATE % (label, value) for (label, value) in rows]),
+        )
+
+    def _get_status_display_name(self, sg_globals, status, project_id):
+        """
+        Returns the display name of the given status.
+
+        Display names are memoized per project, as the header is rendered for
+        the same few statuses over and over.
+        """
+
+        key = (sg_globals, project_id, status)
+
+        if key not in self._status_display_names:
+            self._status_display_names[key] = sg_globals.get_status_display_name(
+                status, project_id=project_id
+            )
+
+        return self._status_display_names[key]
 
     def _get_entity_sg_link(self, text, entity):
         """
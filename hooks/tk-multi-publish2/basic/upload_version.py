@@ -10,7 +10,6 @@
 
 import os
 import pprint
-import tempfile
 import uuid
 import sys
 import sgtk
@@ -189,103 +188,115 @@ class PhotoshopUploadVersionPlugin(HookBaseClass):
         engine = publisher.engine
         document = item.properties["document"]
 
-        path = _document_path(document)
-        upload_path = path
-
-        file_info = publisher.util.get_file_path_components(path)
-        if file_info["extension"] in ["psd", "psb"]:
-
-            with engine.context_changes_disabled():
+        # the temp files written to upload the version are removed once done,
+        # whether the publish succeeded or not.
+        with engine.scratch_space.operation("upload_version") as scratch_folder:
+            path = _document_path(document)
+            upload_path = path
 
-                # remember the active document so that we can restore it.
-                previous_active_document = engine.adobe.get_active_document()
+            file_info = publisher.util.get_file_path_components(path)
+            if file_info["extension"] in ["psd", "psb"]:
 
-                # make the document being processed the active document
-                engine.adobe.app.activeDocument = document
-
-                # path to a temp jpg file
+                # path to a temp jpg file, in the scratch folder
                 upload_path = os.path.join(
-                    tempfile.gettempdir(), "%s_sgtk.jpg" % uuid.uuid4().hex
+                    scratch_folder, "%s_sgtk.jpg" % uuid.uuid4().hex
                 )
 
-                # jpg file/options
-                jpg_file = engine.adobe.File(upload_path)
-                jpg_options = engine.adobe.JPEGSaveOptions()
-                jpg_options.quality = 12
-
-                # mark the temp upload path for removal
-                item.properties["remove_upload"] = True
-
-                # save a jpg copy of the document
-                document.saveAs(jpg_file, jpg_options, True)
-
-                # restore the active document
-                engine.adobe.app.activeDocument = previous_active_document
-
-        # use the path's filename as the publish name
-        path_components = publisher.util.get_file_path_components(path)
-        publish_name = path_components["filename"]
-
-        # populate the version data to send to PTR
-        self.logger.info("Creating Version...")
-        version_data = {
-            "project": item.context.project,
-            "code": publish_name,
-            "description": item.description,
-            "entity": self._get_version_entity(item),
-            "sg_task": item.context.task,
-        }
-
-        publish_data = item.properties.get("sg_publish_data")
-
-        # if the file was published, add the publish data to the version
-        if publish_data:
-            version_data["published_files"] = [publish_data]
+                metrics = engine.get_document_metrics(document)
+
+                if metrics["bit_depth"] == 8:
+                    with engine.context_changes_disabled():
+
+                        # remember the active document so that we can restore it.
+                        previous_active_document = engine.adobe.get_active_document()
+
+                        # make the document being processed the active document
+                        engine.adobe.app.activeDocument = document
+
+                        # jpg file/options
+                        jpg_file = engine.adobe.File(upload_path)
+                        jpg_options = engine.adobe.JPEGSaveOptions()
+                        jpg_options.quality = 12
+
+                        # save a jpg copy of the document
+                        document.saveAs(jpg_file, jpg_options, True)
+
+                        # restore the active document
+                        engine.adobe.app.activeDocument = previous_active_document
+                else:
+                    # jpg files only hold 8 bits per channel. export a full size
+                    # copy of the document converted to 8 bits instead.
+                    engine.export_as_jpeg(
+                        document,
+                        upload_path,
+                        max_size=max(metrics["width"], metrics["height"]),
+                        quality=12,
+                    )
+
+            # use the path's filename as the publish name
+            path_components = publisher.util.get_file_path_components(path)
+            publish_name = path_components["filename"]
+
+            # populate the version data to send to PTR
+            self.logger.info("Creating Version...")
+            version_data = {
+                "project": item.context.project,
+                "code": publish_name,
+                "description": item.description,
+                "entity": self._get_version_entity(item),
+                "sg_task": item.context.task,
+            }
 
-        # log the version data for debugging
-        self.logger.debug(
-            "Populated Version data...",
-            extra={
-                "action_show_more_info": {
-                    "label": "Version Data",
-                    "tooltip": "Show the complete Version data dictionary",
-                    "text": "<pre>%s</pre>" % (pprint.pformat(version_data),),
-                }
-            },
-        )
+            publish_data = item.properties.get("sg_publish_data")
+
+            # if the file was published, add the publish data to the version
+            if publish_data:
+                version_data["published_files"] = [publish_data]
+
+            # log the version data for debugging
+            self.logger.debug(
+                "Populated Version data...",
+                extra={
+                    "action_show_more_info": {
+                        "label": "Version Data",
+                        "tooltip": "Show the complete Version data dictionary",
+                        "text": "<pre>%s</pre>" % (pprint.pformat(version_data),),
+                    }
+                },
+            )
 
-        # create the version
-        self.logger.info("Creating version for review...")
-        version = self.parent.shotgun.create("Version", version_data)
+            # create the version
+            self.logger.info("Creating version for review...")
+            version = self.parent.shotgun.create("Version", version_data)
 
-        # stash the version info in the item just in case
-        item.properties["sg_version_data"] = version
+            # stash the version info in the item just in case
+            item.properties["sg_version_data"] = version
 
-        # Make sure the string is utf8 encoded to avoid issues with the PTR API.
-        upload_path = str(upload_path)
+            # Make sure the string is utf8 encoded to avoid issues with the PTR API.
+            upload_path = str(upload_path)
 
-        # Upload the file to PTR
-        self.logger.info("Uploading content...")
-        self.parent.shotgun.upload(
-            "Version", version["id"], upload_path, "sg_uploaded_movie"
-        )
-        self.logger.info("Upload complete!")
-
-        # thumbnail to upload is the one stored in item
-        thumb = item.get_thumbnail_as_path()
-        # if thumbnail not set, consider the one created from file path
-        if not thumb:
-            thumb = upload_path
-
-        # go ahead and update the publish thumbnail (if there was one)
-        if publish_data:
-            self.logger.info("Updating publish thumbnail...")
-            self.parent.shotgun.upload_thumbnail(
-                publish_data["type"], publish_data["id"], thumb
+            # Upload the file to PTR
+            self.logger.info("Uploading content...")
+            self.parent.shotgun.upload(
+                "Version", version["id"], upload_path, "sg_uploaded_movie"
             )
-            self.logger.info("Publish thumbnail updated!")
+            self.logger.info("Upload complete!")
+
+            # thumbnail to upload is the one stored in item
+            thumb = item.get_thumbnail_as_path()
+            # if thumbnail not set, consider the one created from file path
+            if not thumb:
+                thumb = upload_path
+
+            # go ahead and update the publish thumbnail (if there was one)
+            if publish_data:
+                self.logger.info("Updating publish thumbnail...")
+                self.parent.shotgun.upload_thumbnail(
+                    publish_data["type"], publish_data["id"], thumb
+                )
+                self.logger.info("Publish thumbnail updated!")
 
-        item.properties["upload_path"] = upload_path
+            item.properties["upload_path"] = upload_path
 
     def finalize(self, settings, item):
         """
@@ -311,16 +322,6 @@ class PhotoshopUploadVersionPlugin(HookBaseClass):
             },
         )
 
-        upload_path = item.properties["upload_path"]
-
-        # remove the tmp file
-        if item.properties.get("remove_upload", False):
-            try:
-                os.remove(upload_path)
-            except Exception:
-                self.logger.warn("Unable to remove temp file: %s" % (upload_path,))
-                pass
-
     def _get_version_entity(self, item):
         """
         Returns the best entity to link the version to.
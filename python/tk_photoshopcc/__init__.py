@@ -11,6 +11,14 @@
 import sys
 import sgtk
 
+from .context_cache import ContextCacheEntry
+from .context_header_cache import ContextHeaderCache
+from .icon_cache import IconCache
+from .raw_shotgun_globals import RawShotgunGlobals
+from .save_queue import SaveJob, SaveQueue
+from .scratch_space import ScratchSpace
+from .shared_context_store import SharedContextStore
+from .thumbnail_cache import ThumbnailCache
 
 adobe_bridge = sgtk.platform.import_framework(
     "tk-framework-adobe", "tk_framework_adobe.adobe_bridge"
@@ -0,0 +1,150 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import time
+
+import sgtk
+
+
+class ContextCacheEntry(object):
+    """
+    An entry in the engine's document context cache.
+
+    Along with the context itself, each entry records the modification time
+    and inode of the document at the time it was cached, as well as the time
+    the entry was created. This allows an entry to be validated with a single
+    ``stat`` call when it is looked up, rather than trusting it forever.
+    """
+
+    def __init__(
+        self,
+        path,
+        context=None,
+        mtime=None,
+        inode=None,
+        created=None,
+        serialized_context=None,
+    ):
+        """
+        :param str path: The document path the context belongs to.
+        :param context: The context object associated with the document.
+        :param float mtime: The document's modification time when cached.
+        :param int inode: The document's inode when cached.
+        :param float created: The time the entry was created. Defaults to now.
+        :param str serialized_context: The serialized context associated with
+            the document. If supplied instead of ``context``, it will only be
+            deserialized the first time the context is accessed.
+        """
+        self.path = path
+        self.mtime = mtime
+        self.inode = inode
+        self.created = time.time() if created is None else created
+        self._context = context
+        self._serialized_context = serialized_context
+
+    def __repr__(self):
+        if self._context is None:
+            context_display = "<serialized context>"
+        else:
+            context_display = repr(self._context)
+
+        return "<%s %s: %s>" % (self.__class__.__name__, self.path, context_display)
+
+    @property
+    def context(self):
+        """
+        The context object associated with the document. Entries restored
+        from serialized data deserialize their context on first access.
+        """
+        if self._context is None:
+            self._context = sgtk.Context.deserialize(self._serialized_context)
+        return self._context
+
+    @classmethod
+    def from_context(cls, path, context):
+        """
+        Creates an entry for the given path and context, recording the
+        document's current modification time and inode.
+
+        :param str path: The document path the context belongs to.
+        :param context: The context object associated with the document.
+
+        :returns: A :class:`ContextCacheEntry` instance.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return cls(path, context=context)
+
+        return cls(path, context=context, mtime=stat.st_mtime, inode=stat.st_ino)
+
+    @classmethod
+    def from_dict(cls, path, data):
+        """
+        Creates an entry from data previously returned by :meth:`to_dict`.
+
+        :param str path: The document path the data belongs to.
+        :param dict data: The serialized entry data.
+
+        :returns: A :class:`ContextCacheEntry` instance, or None if the data
+            can't be used.
+        """
+        # Caches stored by older versions of the engine only hold serialized
+        # contexts, without anything to validate them against.
+        if not isinstance(data, dict) or "context" not in data:
+            return None
+
+        return cls(
+            path,
+            mtime=data.get("mtime"),
+            inode=data.get("inode"),
+            created=data.get("created"),
+            serialized_context=data["context"],
+        )
+
+    def to_dict(self):
+        """
+        Returns a serializable representation of the entry.
+
+        :returns: A ``dict`` that can be handed to :meth:`from_dict`.
+        """
+        if self._serialized_context is None:
+            self._serialized_context = self._context.serialize()
+
+        return dict(
+            context=self._serialized_context,
+            mtime=self.mtime,
+            inode=self.inode,
+            created=self.created,
+        )
+
+    def is_valid(self, ttl=None):
+        """
+        Checks whether the entry can still be trusted.
+
+        An entry is considered stale once it is older than the given time to
+        live, or when the document has been moved, replaced or modified since
+        the entry was created. Validation costs a single ``stat`` call.
+
+        :param int ttl: The maximum age of the entry in seconds. ``None`` or
+            ``0`` means entries never expire.
+
+        :returns: True if the entry is still valid, False otherwise.
+        """
+        if ttl and time.time() - self.created > ttl:
+            return False
+
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+
+        return stat.st_mtime == self.mtime and stat.st_ino == self.inode
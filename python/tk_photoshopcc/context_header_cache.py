@@ -0,0 +1,182 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import json
+import os
+import time
+import uuid
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class ContextHeaderCache(object):
+    """
+    A persistent cache of the data displayed in the panel's context header.
+
+    For each entity, the cache holds the queried field values, the rendered
+    header html and the path to the thumbnail to display. Entries are served
+    regardless of their age so the header can be displayed instantly; entries
+    older than the time to live should be refreshed by the caller.
+
+    Updates are kept in memory until :meth:`flush` is called. Entries which
+    haven't been updated for a while are dropped when the cache is written,
+    as are the least recently updated ones beyond the maximum entry count.
+    """
+
+    # The maximum number of entities kept in the cache.
+    MAX_ENTRIES = 1000
+
+    # The number of seconds after which an entry which hasn't been updated is
+    # dropped.
+    MAX_AGE = 30 * 24 * 60 * 60
+
+    def __init__(self, path, ttl, max_entries=MAX_ENTRIES, max_age=MAX_AGE):
+        """
+        :param str path: The path to the file the cache is stored in.
+        :param int ttl: The number of seconds an entry is considered fresh.
+        :param int max_entries: The maximum number of entities kept in the
+            cache.
+        :param int max_age: The number of seconds after which an entry which
+            hasn't been updated is dropped.
+        """
+        self._path = path
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._max_age = max_age
+        self._entries = None
+        self._dirty = False
+
+    def get(self, entity_type, entity_id):
+        """
+        Returns the cached entry for the given entity.
+
+        :param str entity_type: The entity type.
+        :param int entity_id: The entity id.
+
+        :returns: A ``dict`` with ``entity``, ``html``, ``thumb_path`` and
+            ``updated`` keys, or None if the entity isn't cached.
+        """
+        return self._get_entries().get(self._get_key(entity_type, entity_id))
+
+    def is_fresh(self, entry):
+        """
+        Checks whether the given entry is younger than the time to live.
+
+        :param dict entry: An entry returned by :meth:`get`.
+
+        :returns: True if the entry doesn't need to be refreshed.
+        """
+        return time.time() - entry["updated"] < self._ttl
+
+    def update(self, entity_type, entity_id, **values):
+        """
+        Updates the cached entry for the given entity. The update is only
+        written to disk by :meth:`flush`.
+
+        Updating the ``entity`` field values marks the entry as refreshed.
+
+        :param str entity_type: The entity type.
+        :param int entity_id: The entity id.
+        :param values: The ``entity``, ``html`` and/or ``thumb_path`` values
+            to store.
+        """
+        entries = self._get_entries()
+        entry = entries.setdefault(
+            self._get_key(entity_type, entity_id),
+            dict(entity=None, html=None, thumb_path=None, updated=0),
+        )
+        entry.update(values)
+        entry["stored"] = time.time()
+
+        if "entity" in values:
+            entry["updated"] = entry["stored"]
+
+        self._dirty = True
+
+    def flush(self):
+        """
+        Writes the cache to disk if it was updated since it was last written,
+        dropping the expired entries and the least recently updated ones beyond
+        the maximum entry count.
+        """
+        if not self._dirty:
+            return
+
+        self._prune()
+        self._store()
+        self._dirty = False
+
+    def _get_key(self, entity_type, entity_id):
+        """
+        Returns the key an entity is cached under.
+        """
+        return "%s:%s" % (entity_type, entity_id)
+
+    def _get_entries(self):
+        """
+        Returns the cached entries, reading them from disk the first time.
+        """
+        if self._entries is None:
+            try:
+                with open(self._path, "r") as cache_file:
+                    self._entries = json.load(cache_file)
+            except (IOError, OSError, ValueError):
+                self._entries = {}
+
+        return self._entries
+
+    def _prune(self):
+        """
+        Drops the expired entries and the least recently updated ones beyond
+        the maximum entry count.
+        """
+
+        # entries written before the stored time was recorded use the time
+        # their fields were last refreshed instead.
+        def _stored(key):
+            entry = self._entries[key]
+            return entry.get("stored", entry["updated"])
+
+        expiry = time.time() - self._max_age
+        keys = sorted(
+            (key for key in self._entries if _stored(key) > expiry),
+            key=_stored,
+            reverse=True,
+        )
+
+        dropped = len(self._entries) - min(len(keys), self._max_entries)
+        if not dropped:
+            return
+
+        self._entries = dict(
+            (key, self._entries[key]) for key in keys[: self._max_entries]
+        )
+        logger.debug("Dropped %d context header cache entries." % (dropped,))
+
+    def _store(self):
+        """
+        Writes the cached entries to disk.
+        """
+        temp_path = "%s.%s.tmp" % (self._path, uuid.uuid4().hex)
+
+        try:
+            ensure_folder_exists(os.path.dirname(self._path))
+
+            # field values such as datetimes aren't json serializable. they're
+            # only kept to identify the entity's image, so strings will do.
+            with open(temp_path, "w") as cache_file:
+                json.dump(self._entries, cache_file, default=str)
+
+            os.replace(temp_path, self._path)
+        except Exception as e:
+            logger.debug("Unable to store context header cache: %s" % (e,))
@@ -0,0 +1,125 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import base64
+import hashlib
+import os
+import uuid
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class IconCache(object):
+    """
+    A cache of command icons pre-processed for display in the panel.
+
+    Icons shipped with apps can be arbitrarily large. Each icon is scaled down
+    to the panel's display size once, and stored under a name derived from a
+    hash of its content, so the panel is handed a stable path it only needs to
+    load once. Icons that are tiny once processed are returned as inline data
+    URIs instead.
+    """
+
+    # The size, in pixels, icons are scaled to fit in.
+    ICON_SIZE = 64
+
+    # Processed icons up to this many bytes are returned as data URIs.
+    INLINE_SIZE_LIMIT = 2048
+
+    def __init__(self, root, icon_size=ICON_SIZE, inline_size_limit=INLINE_SIZE_LIMIT):
+        """
+        :param str root: The folder to write the processed icons to.
+        :param int icon_size: The size, in pixels, icons are scaled to fit in.
+        :param int inline_size_limit: Processed icons up to this many bytes are
+            returned as data URIs.
+        """
+        self._root = root
+        self._icon_size = icon_size
+        self._inline_size_limit = inline_size_limit
+
+        # processed icons, keyed by source path, modification time and size
+        self._processed = {}
+
+    def get(self, icon_path):
+        """
+        Returns the processed icon to hand to the panel for the given icon.
+
+        :param str icon_path: The path to the source icon.
+
+        :returns: The path to the processed icon, or a data URI. If the icon
+            can't be processed, the source path is returned as is.
+        """
+        if not icon_path:
+            return icon_path
+
+        try:
+            stat = os.stat(icon_path)
+        except OSError:
+            return icon_path
+
+        key = (icon_path, stat.st_mtime, stat.st_size)
+
+        if key not in self._processed:
+            try:
+                self._processed[key] = self._process(icon_path) or icon_path
+            except Exception as e:
+                logger.debug("Unable to process icon %s: %s" % (icon_path, e))
+                self._processed[key] = icon_path
+
+        return self._processed[key]
+
+    def _process(self, icon_path):
+        """
+        Scales the given icon down to the display size and stores it in the
+        cache, unless it has been processed before.
+
+        :param str icon_path: The path to the source icon.
+
+        :returns: The path to the processed icon, a data URI, or None if the
+            icon could not be loaded.
+        """
+        with open(icon_path, "rb") as icon_file:
+            content = icon_file.read()
+
+        digest = hashlib.sha1(content).hexdigest()
+        cached_path = os.path.join(self._root, "%s_%d.png" % (digest, self._icon_size))
+
+        if not os.path.exists(cached_path):
+            from sgtk.platform.qt import QtCore, QtGui
+
+            image = QtGui.QImage()
+            if not image.loadFromData(content):
+                return None
+
+            if image.width() > self._icon_size or image.height() > self._icon_size:
+                image = image.scaled(
+                    self._icon_size,
+                    self._icon_size,
+                    QtCore.Qt.KeepAspectRatio,
+                    QtCore.Qt.SmoothTransformation,
+                )
+
+            # write to a temporary file first so that other processes never
+            # see a partially written icon.
+            ensure_folder_exists(self._root)
+            temp_path = "%s.%s.tmp" % (cached_path, uuid.uuid4().hex)
+            if not image.save(temp_path, "PNG"):
+                return None
+            os.replace(temp_path, cached_path)
+
+        if os.path.getsize(cached_path) <= self._inline_size_limit:
+            with open(cached_path, "rb") as cached_file:
+                encoded = base64.b64encode(cached_file.read()).decode("ascii")
+            return "data:image/png;base64,%s" % (encoded,)
+
+        return cached_path
@@ -0,0 +1,47 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+
+class RawShotgunGlobals(object):
+    """
+    A stand-in for the shotgun globals api, handed to the context fields
+    display hook while the schema of a project is still loading.
+
+    The display name lookups return the raw values they are given rather than
+    waiting for the schema, so the context header can be rendered straight
+    away. Anything else is forwarded to the wrapped shotgun globals.
+    """
+
+    def __init__(self, shotgun_globals):
+        """
+        :param shotgun_globals: The shotgun globals api to wrap.
+        """
+        self._shotgun_globals = shotgun_globals
+
+    def __getattr__(self, name):
+        return getattr(self._shotgun_globals, name)
+
+    def get_status_display_name(self, status_code, project_id=None):
+        """
+        Returns the given status code as is.
+        """
+        return status_code
+
+    def get_type_display_name(self, sg_entity_type, project_id=None):
+        """
+        Returns the given entity type as is.
+        """
+        return sg_entity_type
+
+    def get_field_display_name(self, sg_entity_type, field_name, project_id=None):
+        """
+        Returns the given field name as is.
+        """
+        return field_name
@@ -0,0 +1,211 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import collections
+import threading
+import time
+import uuid
+
+import sgtk
+from sgtk.platform.qt import QtCore
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class SaveJob(object):
+    """
+    A request to save one or more documents, queued in a :class:`SaveQueue`.
+    """
+
+    def __init__(self, items, profile=None):
+        """
+        :param items: A ``list`` of (document, path) tuples. Documents with a
+            path of None are saved in place.
+        :param str profile: The name of the save profile to use, or None to
+            use the default one.
+        """
+        self.id = uuid.uuid4().hex
+        self.items = items
+        self.profile = profile
+        self.finished = False
+        self.error = None
+
+
+class SaveQueue(QtCore.QObject):
+    """
+    A queue of document saves, run one at a time against Photoshop.
+
+    Jobs are run from the Qt event loop, giving it a turn between each of
+    them, so that the UI stays responsive while a batch of documents is being
+    saved. The outcome of each job is reported through Qt signals. A failed
+    job is reported and doesn't prevent the following jobs from running.
+    """
+
+    # emitted with the job id when a job starts running
+    job_started = QtCore.Signal(str)
+
+    # emitted with the job id when a job completes
+    job_completed = QtCore.Signal(str)
+
+    # emitted with the job id and the error message when a job fails
+    job_failed = QtCore.Signal(str, str)
+
+    # emitted with the number of finished jobs and the total number of jobs
+    # queued since the queue was last empty
+    progress = QtCore.Signal(int, int)
+
+    def __init__(self, save_callback, parent=None):
+        """
+        :param save_callback: A callable saving documents, called with the
+            items and profile of each job.
+        :param parent: The parent QObject.
+        """
+        super(SaveQueue, self).__init__(parent)
+
+        self._save_callback = save_callback
+        self._pending = collections.deque()
+        self._running = False
+        self._running_thread = None
+        self._running_job = None
+        self._finished_count = 0
+
+    def add_job(self, document, path=None, profile=None):
+        """
+        Queues a document save. The job will be run once the jobs queued before
+        it have been.
+
+        :param document: The document to save.
+        :param str path: The path to save the document to, or None to save it
+            in place.
+        :param str profile: The name of the save profile to use, or None to
+            use the default one.
+
+        :returns: The queued :class:`SaveJob`.
+        """
+        return self.add_batch_job([(document, path)], profile)
+
+    def add_batch_job(self, items, profile=None):
+        """
+        Queues the save of several documents as a single job. The job will be
+        run once the jobs queued before it have been.
+
+        :param items: A ``list`` of (document, path) tuples. Documents with a
+            path of None are saved in place.
+        :param str profile: The name of the save profile to use, or None to
+            use the default one.
+
+        :returns: The queued :class:`SaveJob`.
+        """
+        job = SaveJob(list(items), profile)
+        self._pending.append(job)
+
+        if len(self._pending) == 1 and not self._running:
+            QtCore.QTimer.singleShot(0, self._run_next_job)
+
+        return job
+
+    def wait(self, job):
+        """
+        Runs the queued jobs until the given one is finished.
+
+        If another job is being run by another thread, Qt events are processed
+        until it is done. If it is being run by this thread, this was called
+        from within that job, e.g. from an event loop spun while saving, and
+        that job can't finish before this returns. The given job is then run
+        straight away instead.
+
+        A job run that way interleaves with the running one: it runs in the
+        middle of it, making its own documents active and setting the
+        preferences of its own save profile, such as ``maximizeCompatibility``,
+        and restores them before the running job carries on. The save callback
+        must not rely on the active document or on the preferences staying the
+        same while Qt events are processed.
+
+        :param job: A :class:`SaveJob` returned by :meth:`add_job`.
+
+        :raises: The error the job failed with, if any.
+        :raises: RuntimeError if the job is the running job, or a job the
+            running one was run from.
+        """
+        while not job.finished:
+            if not self._running:
+                self._run_next_job()
+            elif self._running_thread == threading.current_thread():
+                if job is self._running_job or job not in self._pending:
+                    # the job can only finish once this returns
+                    raise RuntimeError(
+                        "Save job %s can't be waited for from within itself."
+                        % (job.id,)
+                    )
+
+                logger.debug(
+                    "Running save job %s from within the running job." % (job.id,)
+                )
+                self._pending.remove(job)
+                self._run_job(job)
+            else:
+                QtCore.QCoreApplication.processEvents()
+                time.sleep(0.01)
+
+        if job.error:
+            raise job.error
+
+    def _run_next_job(self):
+        """
+        Runs the next queued job, then schedules the one after it.
+        """
+        if self._running or not self._pending:
+            return
+
+        self._run_job(self._pending.popleft())
+
+    def _run_job(self, job):
+        """
+        Runs the given job and reports its outcome, then schedules the next
+        queued one.
+        """
+        # a job run from within the running one hands the queue back to it
+        # once done.
+        (was_running, running_thread, running_job) = (
+            self._running,
+            self._running_thread,
+            self._running_job,
+        )
+
+        self._running = True
+        self._running_thread = threading.current_thread()
+        self._running_job = job
+        self.job_started.emit(job.id)
+
+        try:
+            self._save_callback(job.items, job.profile)
+        except Exception as e:
+            logger.debug("Save job %s failed: %s" % (job.id, e), exc_info=True)
+            job.error = e
+        finally:
+            self._running = was_running
+            self._running_thread = running_thread
+            self._running_job = running_job
+            job.finished = True
+
+        self._finished_count += 1
+        self.progress.emit(
+            self._finished_count, self._finished_count + len(self._pending)
+        )
+
+        if job.error:
+            self.job_failed.emit(job.id, str(job.error))
+        else:
+            self.job_completed.emit(job.id)
+
+        if self._pending:
+            QtCore.QTimer.singleShot(0, self._run_next_job)
+        elif not self._running:
+            self._finished_count = 0
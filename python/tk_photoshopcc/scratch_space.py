@@ -0,0 +1,206 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import re
+import shutil
+import socket
+import sys
+import uuid
+from contextlib import contextmanager
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+logger = sgtk.platform.get_logger(__name__)
+
+# the name of a session folder: the host name, the process id and a random
+# hex uuid
+SESSION_FOLDER_PATTERN = re.compile(r"^(.+)_(\d+)_[0-9a-f]{32}$")
+
+
+class ScratchSpace(object):
+    """
+    A folder holding the temporary files written by the engine, such as
+    exported images waiting to be uploaded.
+
+    Each engine session writes to its own folder under the scratch root, named
+    after the session's host and process id, and each operation gets its own
+    subfolder within it. Operation folders are removed once the operation is
+    done, whether it succeeded or not, and the whole session folder is removed
+    when the engine shuts down. Folders left behind by sessions that crashed
+    are purged by :meth:`purge_orphans`.
+    """
+
+    def __init__(self, root):
+        """
+        :param str root: The folder to create the session folders in.
+        """
+        self._root = root
+        self._host_name = self._get_host_name()
+        self._session_folder = os.path.join(
+            root, "%s_%d_%s" % (self._host_name, os.getpid(), uuid.uuid4().hex)
+        )
+
+    @property
+    def root(self):
+        """
+        The folder the session folders are created in.
+        """
+        return self._root
+
+    def create_folder(self, operation):
+        """
+        Creates a folder for an operation to write its temporary files to.
+
+        The folder must be removed with :meth:`remove_folder` once the files
+        are no longer needed. It is removed along with the session folder
+        otherwise.
+
+        :param str operation: The name of the operation, used as a prefix for
+            the folder name.
+        :returns: The path to the created folder.
+        """
+        folder = os.path.join(
+            self._session_folder, "%s_%s" % (operation, uuid.uuid4().hex)
+        )
+        ensure_folder_exists(folder)
+        return folder
+
+    def remove_folder(self, folder):
+        """
+        Removes a folder created with :meth:`create_folder` and everything in
+        it.
+
+        :param str folder: The path to the folder.
+        """
+        size = self._get_size(folder)
+
+        shutil.rmtree(folder, ignore_errors=True)
+
+        logger.debug("Removed scratch folder %s, freeing %d bytes." % (folder, size))
+
+    @contextmanager
+    def operation(self, operation):
+        """
+        A context manager creating a folder for an operation to write its
+        temporary files to, and removing it on exit, even if the operation
+        failed.
+
+        :param str operation: The name of the operation, used as a prefix for
+            the folder name.
+        """
+        folder = self.create_folder(operation)
+        try:
+            yield folder
+        finally:
+            self.remove_folder(folder)
+
+    def get_size(self):
+        """
+        Returns the total size, in bytes, of the files in the session folder.
+        """
+        return self._get_size(self._session_folder)
+
+    def cleanup(self):
+        """
+        Removes the session folder and everything in it.
+        """
+        if os.path.exists(self._session_folder):
+            self.remove_folder(self._session_folder)
+
+    def purge_orphans(self):
+        """
+        Removes the session folders left behind by engine sessions which are
+        no longer running.
+
+        The scratch root may be shared with other files, so only folders named
+        exactly like session folders are considered. It may also be shared
+        with other machines, whose processes can't be checked, so only folders
+        created on this host are considered.
+        """
+        try:
+            names = os.listdir(self._root)
+        except OSError:
+            return
+
+        for name in names:
+            folder = os.path.join(self._root, name)
+            if folder == self._session_folder or not os.path.isdir(folder):
+                continue
+
+            match = SESSION_FOLDER_PATTERN.match(name)
+            if (
+                not match
+                or match.group(1) != self._host_name
+                or self._is_process_running(int(match.group(2)))
+            ):
+                continue
+
+            logger.debug("Purging orphaned scratch folder %s." % (folder,))
+            self.remove_folder(folder)
+
+    def _get_size(self, folder):
+        """
+        Returns the total size, in bytes, of the files in the given folder.
+        """
+        size = 0
+        for dir_path, _, file_names in os.walk(folder):
+            for file_name in file_names:
+                try:
+                    size += os.path.getsize(os.path.join(dir_path, file_name))
+                except OSError:
+                    pass
+        return size
+
+    def _get_host_name(self):
+        """
+        Returns the name of this host, usable in a folder name.
+        """
+        return re.sub(r"[^a-z0-9-]", "-", socket.gethostname().lower()) or "localhost"
+
+    def _is_process_running(self, pid):
+        """
+        Checks whether a process with the given id is running.
+        """
+        if pid == os.getpid():
+            return True
+
+        if sys.platform == "win32":
+            import ctypes
+
+            ERROR_ACCESS_DENIED = 5
+            PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+            STILL_ACTIVE = 259
+
+            kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+            handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not handle:
+                # the process exists but can't be queried, e.g. it runs
+                # elevated or belongs to another user
+                return ctypes.get_last_error() == ERROR_ACCESS_DENIED
+
+            try:
+                exit_code = ctypes.c_ulong()
+                if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                    return True
+                return exit_code.value == STILL_ACTIVE
+            finally:
+                kernel32.CloseHandle(handle)
+
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # the process exists but belongs to another user
+            return True
+
+        return True
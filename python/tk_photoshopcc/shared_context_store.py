@@ -0,0 +1,298 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import os
+import sqlite3
+import sys
+import threading
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class SharedContextStore(object):
+    """
+    An on-disk store of serialized document contexts that is shared by every
+    engine process running on the machine.
+
+    The store is backed by a SQLite database, which several Photoshop sessions
+    can read and write concurrently. Write-ahead logging is used when the
+    database is known to live on a local disk. It relies on shared memory,
+    which doesn't work on network filesystems, so a rollback journal is used
+    otherwise, e.g. when the site cache is in a home directory shared over the
+    network. Entries are keyed by normalized document path and project id, and
+    hold the same data as :meth:`ContextCacheEntry.to_dict`.
+
+    The store is a cache: any database error is logged and treated as a miss,
+    it never prevents a context from being resolved.
+    """
+
+    # Seconds to wait for another process to release a lock on the database.
+    BUSY_TIMEOUT = 5.0
+
+    # Linux filesystem types the database is considered remote on.
+    NETWORK_FILESYSTEMS = (
+        "9p",
+        "afpfs",
+        "afs",
+        "ceph",
+        "cifs",
+        "fuse.sshfs",
+        "glusterfs",
+        "gpfs",
+        "lustre",
+        "ncpfs",
+        "nfs",
+        "nfs4",
+        "smb3",
+        "smbfs",
+        "webdav",
+    )
+
+    def __init__(self, db_path):
+        """
+        :param str db_path: The path to the SQLite database file. It will be
+            created if it doesn't exist.
+        """
+        self._db_path = db_path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def get(self, path, project_id):
+        """
+        Returns the stored entry data for the given document path.
+
+        :param str path: The document path.
+        :param int project_id: The id of the project the document belongs to.
+
+        :returns: A ``dict`` of entry data, or None if nothing is stored.
+        """
+        row = self._execute(
+            "SELECT context, mtime, inode, created FROM contexts "
+            "WHERE path = ? AND project_id = ?",
+            (self._normalize_path(path), project_id),
+            fetch=True,
+        )
+
+        if not row:
+            return None
+
+        (context, mtime, inode, created) = row
+        return dict(context=context, mtime=mtime, inode=inode, created=created)
+
+    def set(self, path, project_id, data):
+        """
+        Stores entry data for the given document path, replacing anything
+        previously stored for it.
+
+        :param str path: The document path.
+        :param int project_id: The id of the project the document belongs to.
+        :param dict data: Entry data as returned by
+            :meth:`ContextCacheEntry.to_dict`.
+        """
+        self._execute(
+            "INSERT OR REPLACE INTO contexts "
+            "(path, project_id, context, mtime, inode, created) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self._normalize_path(path),
+                project_id,
+                data["context"],
+                data.get("mtime"),
+                data.get("inode"),
+                data.get("created"),
+            ),
+        )
+
+    def delete(self, path, project_id):
+        """
+        Removes anything stored for the given document path.
+
+        :param str path: The document path.
+        :param int project_id: The id of the project the document belongs to.
+        """
+        self._execute(
+            "DELETE FROM contexts WHERE path = ? AND project_id = ?",
+            (self._normalize_path(path), project_id),
+        )
+
+    def close(self):
+        """
+        Closes the connection to the database, if one is open.
+        """
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+    def _normalize_path(self, path):
+        """
+        Returns the key used to store the given path.
+        """
+        return os.path.normcase(os.path.normpath(path))
+
+    def _connect(self):
+        """
+        Opens the database connection and makes sure the schema exists.
+        """
+        ensure_folder_exists(os.path.dirname(self._db_path))
+
+        connection = sqlite3.connect(
+            self._db_path,
+            timeout=self.BUSY_TIMEOUT,
+            check_same_thread=False,
+        )
+        if self._is_local_path(os.path.dirname(self._db_path)):
+            connection.execute("PRAGMA journal_mode=WAL")
+        else:
+            connection.execute("PRAGMA journal_mode=DELETE")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS contexts ("
+            "path TEXT NOT NULL, "
+            "project_id INTEGER, "
+            "context TEXT NOT NULL, "
+            "mtime REAL, "
+            "inode INTEGER, "
+            "created REAL, "
+            "PRIMARY KEY (path, project_id))"
+        )
+        connection.commit()
+        return connection
+
+    def _is_local_path(self, path):
+        """
+        Checks whether the given folder is on a local disk. Folders that can't
+        be determined to be local are considered remote.
+        """
+        path = os.path.realpath(path)
+
+        if sys.platform == "win32":
+            import ctypes
+
+            DRIVE_FIXED = 3
+
+            (drive, _) = os.path.splitdrive(path)
+            if not drive or drive.startswith("\\\\"):
+                # unc path
+                return False
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == DRIVE_FIXED
+
+        if sys.platform.startswith("linux"):
+            # find the filesystem type of the longest mount point holding the
+            # path.
+            mount_point = ""
+            filesystem = None
+            try:
+                with open("/proc/mounts") as mounts:
+                    for line in mounts:
+                        fields = line.split()
+                        if len(fields) < 3:
+                            continue
+                        # spaces in mount points are escaped as \040
+                        point = fields[1].replace("\\040", " ")
+                        if (
+                            path == point or path.startswith(point.rstrip("/") + "/")
+                        ) and len(point) > len(mount_point):
+                            (mount_point, filesystem) = (point, fields[2])
+            except (IOError, OSError):
+                return False
+
+            return filesystem is not None and filesystem not in (
+                self.NETWORK_FILESYSTEMS
+            )
+
+        if sys.platform == "darwin":
+            filesystem = self._get_darwin_filesystem(path)
+            return filesystem is not None and filesystem not in (
+                self.NETWORK_FILESYSTEMS
+            )
+
+        # there is no simple way to tell on other platforms
+        return False
+
+    def _get_darwin_filesystem(self, path):
+        """
+        Returns the type of the filesystem holding the given path on macOS,
+        e.g. ``apfs`` or ``smbfs``, as reported by ``statfs``.
+
+        :returns: The filesystem type name, or None if it can't be retrieved.
+        """
+        import ctypes
+        import ctypes.util
+
+        class StatFs(ctypes.Structure):
+            # struct statfs, in its 64 bit inode variant
+            _fields_ = [
+                ("f_bsize", ctypes.c_uint32),
+                ("f_iosize", ctypes.c_int32),
+                ("f_blocks", ctypes.c_uint64),
+                ("f_bfree", ctypes.c_uint64),
+                ("f_bavail", ctypes.c_uint64),
+                ("f_files", ctypes.c_uint64),
+                ("f_ffree", ctypes.c_uint64),
+                ("f_fsid", ctypes.c_int32 * 2),
+                ("f_owner", ctypes.c_uint32),
+                ("f_type", ctypes.c_uint32),
+                ("f_flags", ctypes.c_uint32),
+                ("f_fssubtype", ctypes.c_uint32),
+                ("f_fstypename", ctypes.c_char * 16),
+                ("f_mntonname", ctypes.c_char * 1024),
+                ("f_mntfromname", ctypes.c_char * 1024),
+                ("f_flags_ext", ctypes.c_uint32),
+                ("f_reserved", ctypes.c_uint32 * 7),
+            ]
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+            try:
+                # intel builds default to the legacy 32 bit inode variant,
+                # arm builds only have the 64 bit one.
+                statfs = libc["statfs$INODE64"]
+            except AttributeError:
+                statfs = libc.statfs
+        except OSError:
+            return None
+
+        statfs.argtypes = [ctypes.c_char_p, ctypes.POINTER(StatFs)]
+        statfs.restype = ctypes.c_int
+
+        stat = StatFs()
+        if statfs(path.encode("utf-8"), ctypes.byref(stat)) != 0:
+            return None
+
+        return stat.f_fstypename.decode("utf-8", "replace")
+
+    def _execute(self, statement, params, fetch=False):
+        """
+        Runs a statement against the database.
+
+        :param str statement: The SQL statement to run.
+        :param tuple params: The statement parameters.
+        :param bool fetch: If True, the first resulting row is returned.
+
+        :returns: The first row if ``fetch`` is True, None otherwise.
+        """
+        with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = self._connect()
+
+                with self._connection:
+                    cursor = self._connection.execute(statement, params)
+                    if fetch:
+                        return cursor.fetchone()
+            except (sqlite3.Error, OSError, sgtk.TankError) as e:
+                logger.debug(
+                    "Shared context store %s unavailable: %s" % (self._db_path, e)
+                )
+                return None
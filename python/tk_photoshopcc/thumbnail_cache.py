@@ -0,0 +1,154 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+import hashlib
+import os
+import uuid
+from urllib.parse import urlparse
+
+import sgtk
+from sgtk.util.filesystem import ensure_folder_exists
+
+logger = sgtk.platform.get_logger(__name__)
+
+
+class ThumbnailCache(object):
+    """
+    A size-bounded on-disk cache of the entity thumbnails displayed in the
+    panel's context header.
+
+    Downloaded thumbnails are scaled down to the size displayed by the panel
+    before being stored. Cached thumbnails are keyed by entity and by a hash of
+    the image url, ignoring its query string since that changes every time a
+    signed url is issued. When the cache grows beyond its byte budget, the
+    least recently used thumbnails are removed.
+    """
+
+    # The size, in pixels, thumbnails are scaled to fit in.
+    THUMBNAIL_SIZE = 256
+
+    def __init__(self, root, max_bytes, thumbnail_size=THUMBNAIL_SIZE):
+        """
+        :param str root: The folder to store the thumbnails in.
+        :param int max_bytes: The maximum total size of the cached thumbnails.
+        :param int thumbnail_size: The size, in pixels, thumbnails are scaled
+            to fit in.
+        """
+        self._root = root
+        self._max_bytes = max_bytes
+        self._thumbnail_size = thumbnail_size
+
+    def get(self, entity_type, entity_id, image_url):
+        """
+        Returns the cached thumbnail for the given entity image.
+
+        :param str entity_type: The entity type.
+        :param int entity_id: The entity id.
+        :param str image_url: The url of the entity's image.
+
+        :returns: The path to the cached thumbnail, or None if it isn't cached.
+        """
+        path = self._get_path(entity_type, entity_id, image_url)
+
+        try:
+            # mark the thumbnail as recently used
+            os.utime(path, None)
+        except OSError:
+            return None
+
+        return path
+
+    def add(self, entity_type, entity_id, image_url, source_path):
+        """
+        Adds a downloaded thumbnail to the cache.
+
+        :param str entity_type: The entity type.
+        :param int entity_id: The entity id.
+        :param str image_url: The url the thumbnail was downloaded from.
+        :param str source_path: The path to the downloaded thumbnail.
+
+        :returns: The path to the cached thumbnail, or None if the thumbnail
+            couldn't be cached.
+        """
+        from sgtk.platform.qt import QtCore, QtGui
+
+        image = QtGui.QImage(source_path)
+        if image.isNull():
+            return None
+
+        if (
+            image.width() > self._thumbnail_size
+            or image.height() > self._thumbnail_size
+        ):
+            image = image.scaled(
+                self._thumbnail_size,
+                self._thumbnail_size,
+                QtCore.Qt.KeepAspectRatio,
+                QtCore.Qt.SmoothTransformation,
+            )
+
+        path = self._get_path(entity_type, entity_id, image_url)
+        temp_path = "%s.%s.tmp" % (path, uuid.uuid4().hex)
+
+        try:
+            ensure_folder_exists(self._root)
+            if not image.save(temp_path, "PNG"):
+                return None
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.debug("Unable to cache thumbnail %s: %s" % (source_path, e))
+            return None
+
+        self._evict()
+        return path
+
+    def _get_path(self, entity_type, entity_id, image_url):
+        """
+        Returns the path a thumbnail is cached at.
+        """
+        url = urlparse(image_url)
+        url_hash = hashlib.sha1(
+            ("%s%s" % (url.netloc, url.path)).encode("utf-8")
+        ).hexdigest()
+
+        return os.path.join(
+            self._root, "%s_%s_%s.png" % (entity_type, entity_id, url_hash)
+        )
+
+    def _evict(self):
+        """
+        Removes the least recently used thumbnails until the cache fits in its
+        byte budget.
+        """
+        thumbnails = []
+        total_bytes = 0
+
+        for name in os.listdir(self._root):
+            path = os.path.join(self._root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            thumbnails.append((stat.st_mtime, stat.st_size, path))
+            total_bytes += stat.st_size
+
+        if total_bytes <= self._max_bytes:
+            return
+
+        for mtime, size, path in sorted(thumbnails):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total_bytes -= size
+            if total_bytes <= self._max_bytes:
+                break
@@ -0,0 +1,149 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Times building the command structure sent to the panel, with the command
+metadata indexed at registration, against the loop used before the index
+existed, which scanned every app for each command to find its instance name
+and rebuilt the favorites lookup for every build.
+
+This benchmark doesn't need Photoshop, only tk-core on the python path:
+
+    python tests/benchmark_commands_state.py [command count] [app count] [build count]
+"""
+
+import sys
+import timeit
+
+import fake_engine
+
+COMMAND_COUNT = 500
+APP_COUNT = 80
+BUILD_COUNT = 100
+FAVORITE_COUNT = 10
+
+
+def _make_engine(command_count, app_count):
+    """
+    Returns an engine with the given number of commands registered by the
+    given number of apps.
+    """
+    apps = dict(
+        ("tk-multi-app%d" % (index,), fake_engine.App("tk-multi-app%d" % (index,)))
+        for index in range(app_count)
+    )
+    favorites = [
+        dict(app_instance="tk-multi-app%d" % (index,), name="Command %d" % (index,))
+        for index in range(FAVORITE_COUNT)
+    ]
+
+    engine = fake_engine.make_engine(
+        settings=dict(shelf_favorites=favorites), apps=apps
+    )
+
+    for index in range(command_count):
+        name = "Command %d" % (index,)
+        app = apps["tk-multi-app%d" % (index % app_count,)]
+        properties = dict(
+            app=app,
+            icon="/path/to/icon_%d.png" % (index,),
+            description="Runs command %d." % (index,),
+            uid=engine.private("get_command_uid")((app.instance_name, name)),
+        )
+        engine.commands[name] = dict(properties=properties)
+
+        # index the command, as registering it does
+        engine.private("get_command_metadata")(properties)
+
+    return engine
+
+
+def _build_commands_state_unindexed(engine):
+    """
+    Builds the command structure the way it was built before the command
+    metadata was indexed.
+    """
+    fav_lookup = {}
+    fav_index = 0
+    for fav_command in engine.get_setting("shelf_favorites"):
+        fav_lookup[fav_command["app_instance"] + fav_command["name"]] = fav_index
+        fav_index += 1
+
+    favorites = []
+    context_menu_cmds = []
+    commands = []
+
+    for command_name, command_info in engine.commands.items():
+        properties = command_info.get("properties", {})
+
+        # check this command's app against the engine's apps.
+        app_instance = properties.get("app", None)
+        app_name = None
+        if app_instance:
+            for app_instance_name, app_instance_obj in engine.apps.items():
+                if app_instance_obj == app_instance:
+                    app_name = app_instance_name
+
+        cmd_type = properties.get("type", "default")
+
+        command = dict(
+            uid=properties.get("uid"),
+            display_name=command_name,
+            icon_path=engine.private("get_icon_path")(properties),
+            description=properties.get("description"),
+            type=cmd_type,
+        )
+
+        fav_name = str(app_name) + command_name
+
+        if cmd_type == "context_menu":
+            context_menu_cmds.append(command)
+        elif fav_name in fav_lookup:
+            command["fav_index"] = fav_lookup[fav_name]
+            favorites.append(command)
+        else:
+            commands.append(command)
+
+    return {
+        "favorites": sorted(favorites, key=lambda d: d["fav_index"]),
+        "commands": sorted(commands, key=lambda d: d["display_name"]),
+        "context_menu_cmds": sorted(context_menu_cmds, key=lambda d: d["display_name"]),
+    }
+
+
+def main(command_count=COMMAND_COUNT, app_count=APP_COUNT, build_count=BUILD_COUNT):
+    engine = _make_engine(command_count, app_count)
+    build = engine.private("build_commands_state")
+
+    def build_indexed():
+        build()
+
+    def build_unindexed():
+        _build_commands_state_unindexed(engine)
+
+    indexed = min(timeit.repeat(build_indexed, number=build_count, repeat=3))
+    unindexed = min(timeit.repeat(build_unindexed, number=build_count, repeat=3))
+
+    print(
+        "%d commands from %d apps, %d builds: %.2f ms per build indexed, "
+        "%.2f ms per build unindexed (%.1fx)"
+        % (
+            command_count,
+            app_count,
+            build_count,
+            indexed * 1000.0 / build_count,
+            unindexed * 1000.0 / build_count,
+            unindexed / indexed,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:4]])
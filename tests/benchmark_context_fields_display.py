@@ -0,0 +1,187 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Times rendering the context header of synthetic entities of each type with the
+context fields display hook, against the hook as it was before it rendered
+precompiled templates, which built the html with ``str.format`` and string
+concatenation. The old hook is read from the git history.
+
+This benchmark doesn't need Photoshop, only tk-core on the python path and git:
+
+    python tests/benchmark_context_fields_display.py [entity count] [revision]
+"""
+
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import timeit
+from unittest import mock
+
+import sgtk
+
+import fake_engine
+
+ENTITY_COUNT = 10000
+
+# the last revision of the hook building the html with str.format
+BASELINE_REVISION = "d23b07b~1"
+
+HOOK_PATH = os.path.join("hooks", "context_fields_display.py")
+
+STATUSES = dict(ip="In Progress", rev="Pending Review", fin="Final")
+
+
+class _ShotgunGlobals(object):
+    def get_status_display_name(self, status_code, project_id=None):
+        return STATUSES.get(status_code, status_code)
+
+
+class _Parent(object):
+    """
+    The engine, as far as the hook is concerned.
+    """
+
+    class sgtk(object):
+        shotgun_url = "https://example.shotgrid.autodesk.com"
+
+    get_panel_link = fake_engine.load_engine_class().get_panel_link
+
+
+def _make_entities(entity_type, count):
+    """
+    Returns entities of the given type, populated with the fields the hook
+    queries for them.
+    """
+    project = dict(type="Project", id=1, name="Big Buck Bunny")
+    statuses = sorted(STATUSES)
+    entities = []
+
+    for index in range(count):
+        entity = dict(
+            type=entity_type,
+            id=index + 1,
+            project=project,
+            sg_status_list=statuses[index % len(statuses)],
+            tag_list=["hero", "tag_%d" % (index % 7,)] if index % 2 else [],
+            description="Description of entity %d." % (index,) if index % 3 else None,
+        )
+
+        if entity_type == "Asset":
+            entity.update(code="asset_%04d" % (index,), sg_asset_type="Character")
+        elif entity_type == "Shot":
+            entity.update(
+                code="shot_%04d" % (index,),
+                sg_sequence=dict(type="Sequence", id=index % 20, name="seq_010"),
+                sg_cut_in=1001,
+                sg_cut_out=1001 + index % 100,
+                sg_head_in=993 if index % 2 else None,
+                sg_tail_out=1109 + index % 100,
+            )
+        elif entity_type == "Task":
+            entity.update(
+                content="Animation" if index % 2 else "anim_%04d" % (index,),
+                step=dict(type="Step", id=1, name="Animation"),
+                entity=dict(type="Shot", id=index + 1, code="shot_%04d" % (index,)),
+                task_assignees=[
+                    dict(type="HumanUser", id=assignee + 1, name="Artist %d" % assignee)
+                    for assignee in range(index % 3)
+                ],
+                due_date="2019-06-%02d" % (index % 28 + 1,) if index % 4 else None,
+            )
+        else:
+            entity.update(name="project_%04d" % (index,), sg_status="Active")
+            del entity["sg_status_list"]
+            del entity["description"]
+            entity["sg_description"] = "Project %d." % (index,)
+
+        entities.append(entity)
+
+    return entities
+
+
+def _load_hook(path):
+    """
+    Returns an instance of the hook at the given path, with the fake engine as
+    its parent.
+    """
+    spec = importlib.util.spec_from_file_location("context_fields_display", path)
+    module = importlib.util.module_from_spec(spec)
+
+    with mock.patch.object(sgtk, "get_hook_baseclass", return_value=sgtk.Hook):
+        spec.loader.exec_module(module)
+
+    return module.ContextFieldsDisplay(_Parent())
+
+
+def _load_baseline_hook(revision):
+    """
+    Returns an instance of the hook at the given revision.
+    """
+    source = subprocess.check_output(
+        ["git", "show", "%s:%s" % (revision, HOOK_PATH.replace(os.sep, "/"))],
+        cwd=fake_engine.ROOT,
+    )
+
+    (handle, path) = tempfile.mkstemp(suffix=".py")
+    try:
+        with os.fdopen(handle, "wb") as hook_file:
+            hook_file.write(source)
+        return _load_hook(path)
+    finally:
+        os.remove(path)
+
+
+def _normalize(html):
+    return re.sub(r"\s+", "", html)
+
+
+def main(entity_count=ENTITY_COUNT, revision=BASELINE_REVISION):
+    hook = _load_hook(os.path.join(fake_engine.ROOT, HOOK_PATH))
+    baseline_hook = _load_baseline_hook(revision)
+    sg_globals = _ShotgunGlobals()
+
+    for entity_type in ["Asset", "Shot", "Task", "Project"]:
+        entities = _make_entities(entity_type, entity_count)
+
+        # both hooks must render the same headers, whitespace aside
+        for entity in entities[:100]:
+            assert _normalize(hook.get_context_html(entity, sg_globals)) == (
+                _normalize(baseline_hook.get_context_html(entity, sg_globals))
+            ), entity
+
+        def render():
+            for entity in entities:
+                hook.get_context_html(entity, sg_globals)
+
+        def render_baseline():
+            for entity in entities:
+                baseline_hook.get_context_html(entity, sg_globals)
+
+        templates = min(timeit.repeat(render, number=1, repeat=3))
+        baseline = min(timeit.repeat(render_baseline, number=1, repeat=3))
+
+        print(
+            "%d %s headers: %.1f ms with templates, %.1f ms with str.format (%.1fx)"
+            % (
+                entity_count,
+                entity_type,
+                templates * 1000.0,
+                baseline * 1000.0,
+                baseline / templates,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]] + sys.argv[2:3])
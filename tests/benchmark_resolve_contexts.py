@@ -0,0 +1,212 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Times resolving the contexts of many documents with ``resolve_contexts``,
+against resolving them one at a time the way switching documents does, which
+looks up every path and stores the whole context cache after each addition.
+
+Contexts are resolved from a path cache held in SQLite, walked one folder at a
+time from the document up to the project root, and the context cache is stored
+as a json file.
+
+This benchmark doesn't need Photoshop, only tk-core on the python path:
+
+    python tests/benchmark_resolve_contexts.py [folder count] [documents per folder]
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import timeit
+import types
+
+import fake_engine
+
+FOLDER_COUNT = 50
+DOCUMENTS_PER_FOLDER = 10
+
+
+class _Context(object):
+    def __init__(self, entity):
+        self.entity = entity
+
+    def serialize(self):
+        return json.dumps(self.entity)
+
+
+class _Sgtk(object):
+    """
+    Resolves contexts from a path cache mapping folders to entities.
+    """
+
+    def __init__(self, root):
+        self.roots = dict(primary=root)
+        self.lookups = 0
+
+        self._path_cache = sqlite3.connect(":memory:")
+        self._path_cache.execute(
+            "CREATE TABLE path_cache (path TEXT PRIMARY KEY, type TEXT, id INTEGER)"
+        )
+
+    def register_folder(self, path, entity):
+        self._path_cache.execute(
+            "INSERT INTO path_cache VALUES (?, ?, ?)",
+            (path, entity["type"], entity["id"]),
+        )
+
+    def context_from_path(self, path, previous_context=None):
+        self.lookups += 1
+
+        # walk up the folders, keeping the deepest entity found
+        entity = None
+        folder = os.path.dirname(path)
+        while True:
+            row = self._path_cache.execute(
+                "SELECT type, id FROM path_cache WHERE path = ?", (folder,)
+            ).fetchone()
+            if row and entity is None:
+                entity = dict(type=row[0], id=row[1])
+
+            if folder == self.roots["primary"]:
+                break
+            folder = os.path.dirname(folder)
+
+        return _Context(entity)
+
+
+class _SettingsManager(object):
+    """
+    Stores settings as json files.
+    """
+
+    SCOPE_PROJECT = "project"
+
+    def __init__(self, folder):
+        self._folder = folder
+        self.stores = 0
+
+    def store(self, name, value, scope):
+        self.stores += 1
+        with open(os.path.join(self._folder, "%s.json" % (name,)), "w") as f:
+            json.dump(value, f)
+
+
+def _make_documents(root, tk, folder_count, documents_per_folder):
+    """
+    Creates documents in shot work folders, registering the shots in the path
+    cache. Returns the paths to the documents.
+    """
+    paths = []
+
+    for index in range(folder_count):
+        shot_folder = os.path.join(
+            root, "sequences", "seq_%02d" % (index // 10,), "shot_%03d" % (index,)
+        )
+        tk.register_folder(shot_folder, dict(type="Shot", id=index + 1))
+
+        work_folder = os.path.join(shot_folder, "work", "photoshop")
+        os.makedirs(work_folder)
+
+        for document in range(documents_per_folder):
+            path = os.path.join(work_folder, "shot_%03d.v%03d.psd" % (index, document))
+            open(path, "w").close()
+            paths.append(path)
+
+    return paths
+
+
+def _resolve_contexts_sequentially(engine, paths):
+    """
+    Resolves the contexts of the given paths one at a time, the way the active
+    document's context is resolved.
+    """
+    contexts = {}
+    for path in paths:
+        context = engine.private("get_from_context_cache")(path)
+        if not context:
+            context = engine.private("get_sgtk_from_path")(path).context_from_path(
+                path, previous_context=engine.context
+            )
+            engine.add_to_context_cache(path, context)
+        contexts[path] = context
+    return contexts
+
+
+def main(folder_count=FOLDER_COUNT, documents_per_folder=DOCUMENTS_PER_FOLDER):
+    root = tempfile.mkdtemp()
+
+    try:
+        tk = _Sgtk(root)
+        settings_manager = _SettingsManager(root)
+        paths = _make_documents(root, tk, folder_count, documents_per_folder)
+
+        context_cache_module = fake_engine.load_module(
+            os.path.join("python", "tk_photoshopcc", "context_cache.py")
+        )
+        engine = fake_engine.make_engine(
+            tk_photoshopcc=types.SimpleNamespace(
+                ContextCacheEntry=context_cache_module.ContextCacheEntry
+            ),
+            settings_manager=settings_manager,
+        )
+        engine.sgtk = tk
+
+        def _time(resolve):
+            """
+            Returns the time it takes to resolve the contexts of the documents
+            from an empty cache, with the number of folder lookups and cache
+            stores made.
+            """
+
+            def _resolve():
+                engine._CONTEXT_CACHE = {}
+                (tk.lookups, settings_manager.stores) = (0, 0)
+                resolve()
+
+            elapsed = min(timeit.repeat(_resolve, number=1, repeat=3))
+            return (elapsed, tk.lookups, settings_manager.stores)
+
+        batched = _time(lambda: engine.resolve_contexts(paths))
+        sequential = _time(lambda: _resolve_contexts_sequentially(engine, paths))
+
+        # both resolve the same contexts
+        engine._CONTEXT_CACHE = {}
+        batched_contexts = engine.resolve_contexts(paths)
+        engine._CONTEXT_CACHE = {}
+        sequential_contexts = _resolve_contexts_sequentially(engine, paths)
+        for path in paths:
+            assert batched_contexts[path].entity == sequential_contexts[path].entity
+
+        print(
+            "%d documents in %d folders: resolve_contexts %.1f ms "
+            "(%d lookups, %d stores), sequential %.1f ms (%d lookups, %d stores) "
+            "(%.1fx)"
+            % (
+                len(paths),
+                folder_count,
+                batched[0] * 1000.0,
+                batched[1],
+                batched[2],
+                sequential[0] * 1000.0,
+                sequential[1],
+                sequential[2],
+                sequential[0] / batched[0],
+            )
+        )
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
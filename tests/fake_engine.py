@@ -0,0 +1,338 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+An engine talking to a fake panel and a fake Shotgun data retriever, shared by
+the tests and benchmarks that don't need Photoshop, only tk-core on the python
+path.
+
+The engine isn't started. Its private state is set up the way
+``pre_app_init`` and ``post_app_init`` set it up, with fakes standing in for
+the objects talking to Photoshop or Shotgun.
+"""
+
+import importlib.util
+import logging
+import os
+from collections import OrderedDict
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+ENGINE_MODULE_PATH = os.path.join(ROOT, "engine.py")
+
+_modules = {}
+
+
+def load_module(path, name=None):
+    """
+    Loads a module of the engine by file path. The tk_photoshopcc package
+    imports frameworks on import, so its modules are loaded on their own.
+
+    :param str path: The path to the module, relative to the engine root.
+    :param str name: The name to give the module, defaults to its file name.
+    """
+    if path not in _modules:
+        name = name or os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = module
+
+    return _modules[path]
+
+
+def load_engine_class():
+    """
+    Returns the engine class.
+    """
+    return load_module("engine.py", "tk_photoshopcc_engine").PhotoshopCCEngine
+
+
+class App(object):
+    def __init__(self, instance_name):
+        self.instance_name = instance_name
+
+
+class Context(object):
+    def __init__(self, task=None, entity=None, project=None):
+        self.task = task
+        self.entity = entity
+        self.project = project
+        self.filesystem_locations = []
+
+
+class IconCache(object):
+    def get(self, path):
+        return path
+
+
+class FakeQtCore(object):
+    """
+    Stands in for ``QtCore``, holding the callbacks of single shot timers
+    until :meth:`run_timers` is called.
+    """
+
+    def __init__(self):
+        self.timers = []
+        fake = self
+
+        class QTimer(object):
+            @staticmethod
+            def singleShot(msec, callback):
+                fake.timers.append(callback)
+
+        self.QTimer = QTimer
+
+    def run_timers(self):
+        """
+        Runs the pending timers, including the ones they start. Errors are
+        logged, as Qt does for errors raised from timer callbacks.
+
+        :returns: The number of timers run.
+        """
+        count = 0
+        while self.timers:
+            callback = self.timers.pop(0)
+            count += 1
+            try:
+                callback()
+            except Exception as e:
+                logging.getLogger("tk-photoshopcc.tests").debug(
+                    "Timer callback failed: %s" % (e,)
+                )
+        return count
+
+    def patch(self):
+        """
+        Returns a context manager making this the ``QtCore`` imported from
+        ``sgtk.platform.qt``.
+        """
+        from unittest import mock
+
+        return mock.patch("sgtk.platform.qt.QtCore", self, create=True)
+
+
+class FakeAdobe(object):
+    """
+    Records the calls made to the panel.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def _record(*args):
+            self.calls.append((name, args))
+
+        return _record
+
+    def count(self, name):
+        return len(self.get_calls(name))
+
+    def get_calls(self, name):
+        return [args for (call_name, args) in self.calls if call_name == name]
+
+
+class FakeDataRetriever(object):
+    """
+    Hands out request uids and records the requests, without ever completing
+    them.
+    """
+
+    def __init__(self):
+        self.requests = OrderedDict()
+        self.stopped = []
+
+    def _add_request(self, *request):
+        uid = "request_%d" % (len(self.requests) + 1,)
+        self.requests[uid] = request
+        return uid
+
+    def execute_find(self, entity_type, filters, fields):
+        return self._add_request("find", entity_type, filters, fields)
+
+    def execute_find_one(self, entity_type, filters, fields):
+        return self._add_request("find_one", entity_type, filters, fields)
+
+    def request_thumbnail(self, url, entity_type, entity_id, field, load_image):
+        return self._add_request("thumbnail", entity_type, entity_id, url)
+
+    def stop_work(self, uid):
+        self.stopped.append(uid)
+
+    def clear(self):
+        pass
+
+    def get_requests(self, request_type):
+        return [
+            (uid, request[1:])
+            for (uid, request) in self.requests.items()
+            if request[0] == request_type
+        ]
+
+
+class FakeHeaderCache(object):
+    """
+    An in-memory context header cache, with entries fresh until marked stale.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.stale = False
+
+    def get(self, entity_type, entity_id):
+        return self.entries.get((entity_type, entity_id))
+
+    def is_fresh(self, entry):
+        return not self.stale
+
+    def update(self, entity_type, entity_id, **values):
+        entry = self.entries.setdefault(
+            (entity_type, entity_id),
+            dict(entity=None, html=None, thumb_path=None, updated=0),
+        )
+        entry.update(values)
+
+    def flush(self):
+        pass
+
+
+class FakeThumbnailCache(object):
+    def get(self, entity_type, entity_id, image_url):
+        return None
+
+    def add(self, entity_type, entity_id, image_url, source_path):
+        return source_path
+
+
+class FakeContextFieldsDisplayHook(object):
+    """
+    Renders the entity fields, recording the shotgun globals handed over.
+    """
+
+    def __init__(self):
+        self.renders = []
+
+    def get_entity_fields(self, entity_type):
+        return ["code"]
+
+    def get_context_html(self, entity, sg_globals):
+        self.renders.append((entity, sg_globals))
+        return "<div>%s %s</div>" % (
+            sg_globals.get_type_display_name(entity["type"]),
+            entity.get("code"),
+        )
+
+
+class FakeShotgunGlobals(object):
+    """
+    Shotgun globals whose schema is loaded only when :meth:`load_schemas` is
+    called.
+    """
+
+    def __init__(self):
+        self.callbacks = []
+
+    def run_on_schema_loaded(self, callback, project_id=None):
+        self.callbacks.append(callback)
+
+    def load_schemas(self):
+        (callbacks, self.callbacks) = (self.callbacks, [])
+        for callback in callbacks:
+            callback()
+
+    def get_type_display_name(self, sg_entity_type, project_id=None):
+        return "%s display name" % (sg_entity_type,)
+
+
+def make_engine(settings=None, apps=None, **private_state):
+    """
+    Returns an engine talking to a fake panel, without initializing it.
+
+    :param dict settings: Engine settings, in addition to the defaults.
+    :param dict apps: The engine's apps, keyed by instance name.
+    :param private_state: Private engine attributes to set up, keyed by name
+        without the leading underscores, overriding the defaults.
+    """
+    engine_class = load_engine_class()
+    raw_shotgun_globals_class = load_module(
+        os.path.join("python", "tk_photoshopcc", "raw_shotgun_globals.py")
+    ).RawShotgunGlobals
+
+    engine_settings = dict(shelf_favorites=[], context_cache_ttl=0)
+    engine_settings.update(settings or {})
+
+    class _FakeEngine(engine_class):
+        adobe = None
+        apps = None
+        commands = None
+        context = None
+        disk_location = ROOT
+        environment = dict(name="project")
+        logger = logging.getLogger("tk-photoshopcc.tests")
+        sgtk = None
+
+        def __init__(self):
+            self.adobe = FakeAdobe()
+            self.apps = apps or {}
+            self.commands = {}
+            self.context = Context()
+
+            shotgun_globals = FakeShotgunGlobals()
+
+            state = dict(
+                sent_commands_state=None,
+                commands_state_cache=OrderedDict(),
+                command_index={},
+                command_uids={},
+                command_dispatch=None,
+                favorites_lookup=None,
+                icon_cache=IconCache(),
+                jump_to_sg_command_id=1,
+                jump_to_fs_command_id=2,
+                context_find_uid=None,
+                context_thumb_uid=None,
+                context_display_entity=None,
+                context_thumb_entity=None,
+                context_fields_display_hook=FakeContextFieldsDisplayHook(),
+                prefetch_queue=[],
+                prefetch_thumbnail_queue=[],
+                prefetch_requests={},
+                send_state_scheduled=False,
+                send_state_forced=False,
+                send_state_coalesced=0,
+                sending_state=False,
+                sg_data=FakeDataRetriever(),
+                header_cache=FakeHeaderCache(),
+                thumbnail_cache=FakeThumbnailCache(),
+                shotgun_globals=shotgun_globals,
+                raw_shotgun_globals=raw_shotgun_globals_class(shotgun_globals),
+                schema_loaded_projects=set(),
+                pending_header_renders={},
+                shared_context_store=None,
+            )
+            state.update(private_state)
+
+            for name, value in state.items():
+                setattr(self, "_PhotoshopCCEngine__%s" % (name,), value)
+
+        def get_setting(self, key, default=None):
+            return engine_settings.get(key, default)
+
+        def get_entity_url(self, entity):
+            return "https://example.com/detail/%s/%d" % (entity["type"], entity["id"])
+
+        def private(self, name):
+            """
+            Returns a private engine attribute or method.
+            """
+            return getattr(self, "_PhotoshopCCEngine__%s" % (name,))
+
+    return _FakeEngine()
@@ -9,6 +9,8 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 import os
+import shutil
+import tempfile
 
 import sgtk
 
@@ -54,3 +56,74 @@ class TestPhotoshopRPC(TestAdobeRPC):
 
         art_layers[0].remove()
         self.assertEqual(art_layers.length, current_layers)
+
+    def test_export_documents(self):
+        engine = sgtk.platform.current_engine()
+        output_dir = tempfile.mkdtemp()
+
+        try:
+            exported = engine.export_documents(
+                [self.document], output_dir, max_size=64, format="png"
+            )
+
+            self.assertEqual([self.document], list(exported.keys()))
+            self.assertEqual(
+                os.path.join(output_dir, "empty.png"), exported[self.document]
+            )
+            self.assertTrue(os.path.exists(exported[self.document]))
+        finally:
+            shutil.rmtree(output_dir)
+
+    def test_export_inactive_document(self):
+        # an image not resized is saved straight from the document, which has
+        # to be made active to be saved
+        engine = sgtk.platform.current_engine()
+        output_dir = tempfile.mkdtemp()
+        other_document = self.adobe.app.documents.add(64, 64)
+        self.adobe.app.activeDocument = self.document
+
+        try:
+            exported = engine.export_documents(
+                [other_document], output_dir, max_size=2048, format="png"
+            )
+
+            self.assertTrue(os.path.exists(exported[other_document]))
+            self.assertEqual(self.document.id, self.adobe.app.activeDocument.id)
+        finally:
+            other_document.close(self.adobe.SaveOptions.DONOTSAVECHANGES)
+            self.adobe.app.activeDocument = self.document
+            shutil.rmtree(output_dir)
+
+    def test_document_metrics(self):
+        engine = sgtk.platform.current_engine()
+        ruler_units = self.adobe.app.preferences.rulerUnits
+        metrics = engine.get_document_metrics(self.document)
+
+        for key in ("width", "height", "bit_depth", "layer_count"):
+            self.assertTrue(isinstance(metrics[key], int))
+        self.assertTrue(metrics["width"] > 0)
+        self.assertTrue(metrics["height"] > 0)
+        self.assertTrue(metrics["resolution"] > 0)
+        self.assertEqual(ruler_units, self.adobe.app.preferences.rulerUnits)
+
+    def test_document_metrics_percent_units(self):
+        # with percent ruler units, the document UnitValues are relative to the
+        # document size and can't be converted to pixels.
+        engine = sgtk.platform.current_engine()
+        preferences = self.adobe.app.preferences
+        ruler_units = preferences.rulerUnits
+
+        try:
+            preferences.rulerUnits = self.adobe.Units.PIXELS
+            pixel_metrics = engine.get_document_metrics(self.document)
+            pixel_width = self.document.width.value
+            pixel_height = self.document.height.value
+
+            preferences.rulerUnits = self.adobe.Units.PERCENT
+            percent_metrics = engine.get_document_metrics(self.document)
+        finally:
+            preferences.rulerUnits = ruler_units
+
+        self.assertEqual(int(round(pixel_width)), pixel_metrics["width"])
+        self.assertEqual(int(round(pixel_height)), pixel_metrics["height"])
+        self.assertEqual(pixel_metrics, percent_metrics)
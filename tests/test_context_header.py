@@ -0,0 +1,279 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Checks how the context header is displayed as the queries made for it complete
+or fail, whether the schema is loaded or still loading, and how the headers of
+the other open documents are prefetched, against a fake panel and a fake
+Shotgun data retriever.
+
+These tests don't need Photoshop, only tk-core on the python path:
+
+    python tests/test_context_header.py
+"""
+
+import math
+import unittest
+
+import fake_engine
+
+SHOT = dict(type="Shot", id=1)
+
+MAX_PREFETCH_REQUESTS = fake_engine.load_engine_class()._MAX_PREFETCH_REQUESTS
+
+PREFETCH_BATCH_SIZE = fake_engine.load_engine_class()._PREFETCH_BATCH_SIZE
+
+
+class ContextHeaderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = fake_engine.make_engine()
+        self.sg_data = self.engine.private("sg_data")
+        self.header_cache = self.engine.private("header_cache")
+        self.engine.context = fake_engine.Context(entity=SHOT)
+
+    def send_state(self):
+        self.engine.private("send_state")(False)
+
+    def complete_request(self, uid, data):
+        self.engine.private("on_worker_signal")(uid, None, data)
+
+    def fail_request(self, uid, msg="Connection refused."):
+        self.engine.private("on_worker_failure")(uid, msg)
+
+    def get_displayed(self):
+        return [args[0] for args in self.engine.adobe.get_calls("send_context_display")]
+
+
+class TestWorkerFailure(ContextHeaderTestCase):
+    def test_failure_without_cached_header(self):
+        self.send_state()
+        self.fail_request(self.engine.private("context_find_uid"))
+
+        self.assertEqual(1, len(self.get_displayed()))
+        self.assertIn("There was an error", self.get_displayed()[0])
+
+    def test_failure_with_cached_thumbnail_only(self):
+        # a thumbnail was cached, but the fields were never displayed
+        self.header_cache.update("Shot", 1, thumb_path="/path/to/thumb.png")
+        self.header_cache.stale = True
+        self.send_state()
+        self.fail_request(self.engine.private("context_find_uid"))
+
+        self.assertEqual(1, len(self.get_displayed()))
+        self.assertIn("There was an error", self.get_displayed()[0])
+
+    def test_failure_with_cached_header(self):
+        # the cached header is displayed while being refreshed
+        self.header_cache.update("Shot", 1, html="<div>Shot 010</div>")
+        self.header_cache.stale = True
+        self.send_state()
+        self.fail_request(self.engine.private("context_find_uid"))
+
+        # and kept rather than replaced with the error
+        self.assertEqual(["<div>Shot 010</div>"], self.get_displayed())
+
+
+class TestSchemaLoading(ContextHeaderTestCase):
+    """
+    Displays the header of an entity whose project schema is still loading.
+    """
+
+    def setUp(self):
+        super(TestSchemaLoading, self).setUp()
+        self.shotgun_globals = self.engine.private("shotgun_globals")
+
+    def complete_query(self):
+        self.send_state()
+        self.complete_request(
+            self.engine.private("context_find_uid"),
+            dict(sg=dict(SHOT, code="010", project=dict(type="Project", id=5))),
+        )
+
+    def test_raw_header_displayed(self):
+        self.complete_query()
+
+        # the header is displayed with raw values without waiting for the schema
+        self.assertEqual(["<div>Shot 010</div>"], self.get_displayed())
+        self.assertEqual(1, len(self.shotgun_globals.callbacks))
+
+        # but isn't cached
+        cached_header = self.header_cache.get("Shot", 1)
+        self.assertFalse(cached_header and cached_header["html"])
+
+    def test_header_rendered_once_schema_loaded(self):
+        self.complete_query()
+        self.shotgun_globals.load_schemas()
+
+        # the header is rendered again with display names, sent and cached
+        html = "<div>Shot display name 010</div>"
+        self.assertEqual(["<div>Shot 010</div>", html], self.get_displayed())
+        self.assertEqual(html, self.header_cache.get("Shot", 1)["html"])
+
+        # later queries for the project's entities are rendered right away
+        self.engine._PhotoshopCCEngine__sent_commands_state = None
+        self.header_cache.stale = True
+        self.complete_query()
+        renders = self.engine.private("context_fields_display_hook").renders
+        self.assertIs(self.shotgun_globals, renders[-1][1])
+        self.assertEqual(html, self.get_displayed()[-1])
+        self.assertEqual(0, len(self.shotgun_globals.callbacks))
+
+    def test_header_of_other_context_not_sent(self):
+        self.complete_query()
+
+        # the context changed while the schema was loading
+        self.engine.context = fake_engine.Context(entity=dict(type="Shot", id=2))
+        self.shotgun_globals.load_schemas()
+
+        # the header is cached but not displayed
+        self.assertEqual(["<div>Shot 010</div>"], self.get_displayed())
+        self.assertEqual(
+            "<div>Shot display name 010</div>", self.header_cache.get("Shot", 1)["html"]
+        )
+
+
+class TestPrefetch(ContextHeaderTestCase):
+    """
+    Prefetches the headers of the other open documents' contexts.
+    """
+
+    def setUp(self):
+        super(TestPrefetch, self).setUp()
+
+        # the open documents, and the contexts cached for them
+        self.contexts = {}
+        self.engine._PhotoshopCCEngine__get_open_document_paths = lambda: list(
+            self.contexts
+        )
+        self.engine._PhotoshopCCEngine__get_from_context_cache = self.contexts.get
+
+    def open_documents(self, entity_type, count):
+        for entity_id in range(2, count + 2):
+            path = "/project/%s/%d.psd" % (entity_type, entity_id)
+            self.contexts[path] = fake_engine.Context(
+                entity=dict(type=entity_type, id=entity_id)
+            )
+
+    def start_prefetch(self):
+        self.engine.private("start_prefetch")()
+
+    def get_queries(self):
+        return self.sg_data.get_requests("find")
+
+    def complete_queries(self):
+        """
+        Completes the prefetch queries in flight, and the ones submitted as
+        they complete.
+        """
+        while self.engine.private("prefetch_requests"):
+            uid = next(iter(self.engine.private("prefetch_requests")))
+            (_, entity_type, filters, _) = self.sg_data.requests[uid]
+            entities = [
+                dict(type=entity_type, id=entity_id, code="%d" % (entity_id,))
+                for entity_id in filters[0][2]
+            ]
+            self.complete_request(uid, dict(sg=entities))
+
+    def get_queried_ids(self):
+        return [filters[0][2] for (_, (_, filters, _)) in self.get_queries()]
+
+    def test_one_query_per_type(self):
+        self.open_documents("Shot", 10)
+        self.open_documents("Asset", 10)
+        self.start_prefetch()
+        self.complete_queries()
+
+        # the headers of 20 documents are fetched by one query for each type
+        queries = self.get_queries()
+        self.assertEqual(2, len(queries))
+        self.assertEqual(["Shot", "Asset"], [q[0] for (_, q) in queries])
+        self.assertEqual(list(range(2, 12)), self.get_queried_ids()[0])
+        self.assertEqual(list(range(2, 12)), self.get_queried_ids()[1])
+        self.assertFalse(self.engine.private("prefetch_requests"))
+
+    def test_current_context_skipped(self):
+        self.open_documents("Shot", 3)
+        self.contexts["/project/Shot/1.psd"] = fake_engine.Context(entity=SHOT)
+        self.start_prefetch()
+
+        self.assertEqual([[2, 3, 4]], self.get_queried_ids())
+
+    def test_fresh_headers_skipped(self):
+        self.open_documents("Shot", 3)
+        self.header_cache.update("Shot", 3, html="<div>Shot 3</div>")
+        self.start_prefetch()
+
+        self.assertEqual([[2, 4]], self.get_queried_ids())
+
+    def test_batches(self):
+        count = PREFETCH_BATCH_SIZE * 2 + 20
+        self.open_documents("Shot", count)
+        self.start_prefetch()
+
+        # the queries are split in batches, only a few of them in flight
+        self.assertEqual(MAX_PREFETCH_REQUESTS, len(self.get_queries()))
+
+        self.complete_queries()
+
+        queried_ids = self.get_queried_ids()
+        self.assertEqual(
+            math.ceil(count / float(PREFETCH_BATCH_SIZE)), len(queried_ids)
+        )
+        self.assertEqual(
+            [PREFETCH_BATCH_SIZE, PREFETCH_BATCH_SIZE, 20],
+            [len(ids) for ids in queried_ids],
+        )
+        self.assertEqual(
+            list(range(2, count + 2)), [i for ids in queried_ids for i in ids]
+        )
+
+    def test_in_flight_limit(self):
+        for entity_type in ["Shot", "Asset", "Sequence", "Task"]:
+            self.open_documents(entity_type, 5)
+        self.start_prefetch()
+
+        # one query per type, but only a few of them in flight at once
+        self.assertEqual(["Shot", "Asset"], [q[0] for (_, q) in self.get_queries()])
+
+        uid = self.get_queries()[0][0]
+        self.complete_request(uid, dict(sg=[]))
+        self.assertEqual(3, len(self.get_queries()))
+
+        self.fail_request(self.get_queries()[1][0])
+        self.assertEqual(4, len(self.get_queries()))
+
+        self.assertEqual(
+            MAX_PREFETCH_REQUESTS, len(self.engine.private("prefetch_requests"))
+        )
+
+    def test_thumbnails_prefetched(self):
+        self.open_documents("Shot", 3)
+        self.start_prefetch()
+
+        (uid, (_, filters, _)) = self.get_queries()[0]
+        entities = [
+            dict(type="Shot", id=entity_id, image="https://example.com/%d.png" % i)
+            for (i, entity_id) in enumerate(filters[0][2])
+        ]
+        self.complete_request(uid, dict(sg=entities))
+
+        # the thumbnails are downloaded as part of the prefetch, a few at once
+        thumbnails = self.sg_data.get_requests("thumbnail")
+        self.assertEqual(MAX_PREFETCH_REQUESTS, len(thumbnails))
+
+        self.complete_request(thumbnails[0][0], dict(thumb_path="/path/to/2.png"))
+        self.assertEqual(3, len(self.sg_data.get_requests("thumbnail")))
+        self.assertEqual(
+            "/path/to/2.png", self.header_cache.get("Shot", 2)["thumb_path"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
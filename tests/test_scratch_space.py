@@ -0,0 +1,95 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Checks which session folders left in the scratch root are purged.
+
+These tests don't need Photoshop, only tk-core on the python path:
+
+    python tests/test_scratch_space.py
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import uuid
+
+import fake_engine
+
+
+class TestPurgeOrphans(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        self.module = fake_engine.load_module(
+            os.path.join("python", "tk_photoshopcc", "scratch_space.py")
+        )
+        self.scratch_space = self.module.ScratchSpace(self.root)
+        self.host_name = self.scratch_space._get_host_name()
+
+        # the id of a process which is no longer running
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        self.dead_pid = process.pid
+
+    def make_folder(self, name):
+        folder = os.path.join(self.root, name)
+        os.makedirs(folder)
+        return folder
+
+    def make_session_folder(self, host_name, pid):
+        return self.make_folder("%s_%d_%s" % (host_name, pid, uuid.uuid4().hex))
+
+    def test_crashed_session_purged(self):
+        folder = self.make_session_folder(self.host_name, self.dead_pid)
+        self.scratch_space.purge_orphans()
+
+        self.assertFalse(os.path.exists(folder))
+
+    def test_running_session_kept(self):
+        folder = self.make_session_folder(self.host_name, os.getppid())
+        self.scratch_space.purge_orphans()
+
+        self.assertTrue(os.path.exists(folder))
+
+    def test_other_host_session_kept(self):
+        # the scratch root is shared with another machine, whose processes
+        # can't be checked from here
+        folder = self.make_session_folder("other-host", self.dead_pid)
+        self.scratch_space.purge_orphans()
+
+        self.assertTrue(os.path.exists(folder))
+
+    def test_other_folders_kept(self):
+        folders = [
+            self.make_folder("%d_%s" % (self.dead_pid, uuid.uuid4().hex)),
+            self.make_folder("%s_%d" % (self.host_name, self.dead_pid)),
+            self.make_folder("photos"),
+        ]
+        self.scratch_space.purge_orphans()
+
+        for folder in folders:
+            self.assertTrue(os.path.exists(folder))
+
+    def test_session_folder_named_after_host(self):
+        folder = self.scratch_space.create_folder("export")
+        session_name = os.path.basename(os.path.dirname(folder))
+        match = self.module.SESSION_FOLDER_PATTERN.match(session_name)
+
+        self.assertEqual(self.host_name, match.group(1))
+        self.assertEqual(os.getpid(), int(match.group(2)))
+
+
+if __name__ == "__main__":
+    unittest.main()
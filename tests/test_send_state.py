@@ -0,0 +1,187 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Checks that requests to send the state to the panel are coalesced, and that
+sending it reuses the context header query already in flight for the same
+entity, against a fake panel and a fake Shotgun data retriever.
+
+These tests don't need Photoshop, only tk-core on the python path:
+
+    python tests/test_send_state.py
+"""
+
+import unittest
+
+import fake_engine
+
+SEND_COUNT = 5
+
+
+class TestSendState(unittest.TestCase):
+    def setUp(self):
+        self.engine = fake_engine.make_engine()
+        self.sg_data = self.engine.private("sg_data")
+        self.engine.context = fake_engine.Context(entity=dict(type="Shot", id=1))
+
+    def send_state(self, force=False):
+        self.engine.private("send_state")(force)
+
+    def get_query_count(self):
+        return len(self.sg_data.get_requests("find_one"))
+
+    def test_query_in_flight_reused(self):
+        # switching between documents sharing a context while its header is
+        # being queried sends the state several times
+        for _ in range(SEND_COUNT):
+            self.send_state()
+
+        # every send after the first reuses the query in flight
+        avoided = SEND_COUNT - self.get_query_count()
+        self.assertEqual(SEND_COUNT - 1, avoided)
+        self.assertEqual(1, self.engine.adobe.count("context_about_to_change"))
+        self.assertEqual(1, self.engine.adobe.count("send_commands"))
+
+    def test_query_for_other_entity(self):
+        self.send_state()
+        self.engine.context = fake_engine.Context(entity=dict(type="Shot", id=2))
+        self.send_state()
+
+        self.assertEqual(2, self.get_query_count())
+
+    def test_forced_send_queries_again(self):
+        # the panel clears its header when the commands are sent again, so
+        # the query has to be made again for it to be displayed
+        self.send_state()
+        self.send_state(force=True)
+
+        self.assertEqual(2, self.get_query_count())
+        self.assertEqual(2, self.engine.adobe.count("context_about_to_change"))
+
+    def test_changed_commands_query_again(self):
+        self.send_state()
+        self.engine.commands["Publish..."] = dict(
+            properties=dict(uid=3, description="Publishes the document.")
+        )
+        self.send_state()
+
+        self.assertEqual(2, self.get_query_count())
+        self.assertEqual(2, self.engine.adobe.count("send_commands"))
+
+    def test_thumbnail_in_flight_not_reused(self):
+        # the fields were displayed already, only the thumbnail is pending
+        self.send_state()
+        self.engine._PhotoshopCCEngine__context_find_uid = None
+        self.engine._PhotoshopCCEngine__context_thumb_uid = "thumbnail_1"
+        self.send_state()
+
+        self.assertEqual(2, self.get_query_count())
+
+
+class TestScheduleSendState(unittest.TestCase):
+    """
+    Goes through the scheduler coalescing the requests to send the state.
+    """
+
+    def setUp(self):
+        self.engine = fake_engine.make_engine()
+        self.engine.context = fake_engine.Context(entity=dict(type="Shot", id=1))
+        self.qt_core = fake_engine.FakeQtCore()
+
+        patcher = self.qt_core.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # count the sends actually run, and let tests act while one is running
+        self.sends = []
+        self.during_send = None
+        send_state = self.engine.private("send_state")
+
+        def _send_state(force=False):
+            self.sends.append(force)
+            if self.during_send:
+                self.during_send()
+            send_state(force=force)
+
+        self.engine._PhotoshopCCEngine__send_state = _send_state
+
+    def schedule_send_state(self, force=False):
+        self.engine.private("schedule_send_state")(force)
+
+    def test_requests_coalesced(self):
+        for _ in range(SEND_COUNT):
+            self.schedule_send_state()
+
+        self.assertEqual(1, len(self.qt_core.timers))
+        self.qt_core.run_timers()
+
+        # every request after the first is served by the same send
+        self.assertEqual([False], self.sends)
+        self.assertEqual(SEND_COUNT - 1, self.engine.private("send_state_coalesced"))
+
+    def test_forced_request_coalesced(self):
+        self.schedule_send_state()
+        self.schedule_send_state(force=True)
+        self.schedule_send_state()
+        self.qt_core.run_timers()
+
+        self.assertEqual([True], self.sends)
+
+    def test_request_during_send(self):
+        # RPC waits process Qt events, so requests come in during a send
+        def _request():
+            self.during_send = None
+            self.schedule_send_state(force=True)
+
+        self.during_send = _request
+        self.schedule_send_state()
+        self.qt_core.run_timers()
+
+        # the request made during the first send is served by a second one
+        self.assertEqual([False, True], self.sends)
+        self.assertEqual(0, len(self.qt_core.timers))
+
+    def test_request_during_failed_send(self):
+        def _fail():
+            self.during_send = None
+            self.schedule_send_state()
+            raise RuntimeError("Lost connection to Photoshop.")
+
+        self.during_send = _fail
+        self.schedule_send_state()
+        self.qt_core.run_timers()
+
+        # the request made during the failed send is still served
+        self.assertEqual(2, len(self.sends))
+        self.assertFalse(self.engine.private("send_state_scheduled"))
+
+        # and later requests are too
+        self.schedule_send_state(force=True)
+        self.assertEqual(1, len(self.qt_core.timers))
+        self.qt_core.run_timers()
+        self.assertEqual(3, len(self.sends))
+
+    def test_failed_send(self):
+        self.during_send = self.fail_send
+        self.schedule_send_state()
+        self.qt_core.run_timers()
+
+        self.during_send = None
+        self.schedule_send_state(force=True)
+        self.assertEqual(1, len(self.qt_core.timers))
+        self.qt_core.run_timers()
+        self.assertEqual(2, len(self.sends))
+
+    def fail_send(self):
+        raise RuntimeError("Lost connection to Photoshop.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# Copyright (c) 2019 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Exercises the shared context store from several local processes at once, and
+checks how the filesystem the database is on is detected.
+
+These tests don't need Photoshop, only tk-core on the python path:
+
+    python tests/test_shared_context_store.py
+"""
+
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+STORE_MODULE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "python",
+    "tk_photoshopcc",
+    "shared_context_store.py",
+)
+
+PROCESS_COUNT = 4
+ENTRY_COUNT = 200
+
+
+def _load_store_module():
+    # the tk_photoshopcc package imports frameworks on import, so the module
+    # is loaded on its own.
+    spec = importlib.util.spec_from_file_location(
+        "shared_context_store", STORE_MODULE_PATH
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _write_and_read(db_path, worker, queue):
+    store = _load_store_module().SharedContextStore(db_path)
+    failures = 0
+
+    try:
+        for index in range(ENTRY_COUNT):
+            path = "/project/worker_%d/document_%d.psd" % (worker, index)
+            data = dict(context="context %d %d" % (worker, index), mtime=index)
+            store.set(path, 1, data)
+
+            stored = store.get(path, 1)
+            if not stored or stored["context"] != data["context"]:
+                failures += 1
+
+            # read what the other workers wrote so far
+            store.get("/project/worker_%d/document_%d.psd" % (index % 4, index), 1)
+    finally:
+        store.close()
+
+    queue.put(failures)
+
+
+class TestSharedContextStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.folder, "context_cache.db")
+        self.module = _load_store_module()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        store = self.module.SharedContextStore(self.db_path)
+        data = dict(context="serialized", mtime=1.5, inode=2, created=3.5)
+
+        store.set("/project/document.psd", 1, data)
+        self.assertEqual(data, store.get("/project/document.psd", 1))
+        self.assertIsNone(store.get("/project/document.psd", 2))
+
+        store.delete("/project/document.psd", 1)
+        self.assertIsNone(store.get("/project/document.psd", 1))
+        store.close()
+
+    def test_unavailable_database(self):
+        # errors are treated as misses
+        store = self.module.SharedContextStore(self.folder)
+        self.assertIsNone(store.get("/project/document.psd", 1))
+        store.close()
+
+    def test_darwin_local_path(self):
+        store = self.module.SharedContextStore(self.db_path)
+
+        with mock.patch.object(self.module.sys, "platform", "darwin"):
+            for filesystem, local in [
+                ("apfs", True),
+                ("hfs", True),
+                ("smbfs", False),
+                ("afpfs", False),
+                ("nfs", False),
+                (None, False),
+            ]:
+                with mock.patch.object(
+                    store, "_get_darwin_filesystem", return_value=filesystem
+                ):
+                    self.assertEqual(local, store._is_local_path(self.folder))
+
+    def test_concurrent_processes(self):
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_write_and_read, args=(self.db_path, worker, queue)
+            )
+            for worker in range(PROCESS_COUNT)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(0, process.exitcode)
+
+        failures = [queue.get() for _ in processes]
+        self.assertEqual([0] * PROCESS_COUNT, failures)
+
+        store = self.module.SharedContextStore(self.db_path)
+        for worker in range(PROCESS_COUNT):
+            for index in range(ENTRY_COUNT):
+                path = "/project/worker_%d/document_%d.psd" % (worker, index)
+                self.assertEqual(
+                    "context %d %d" % (worker, index), store.get(path, 1)["context"]
+                )
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()